@@ -1,22 +1,53 @@
+import asyncio
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 
+from app.config import settings
+from app.services.metrics import BCRYPT_LATENCY
 
+
+@BCRYPT_LATENCY.labels("hash").time()
 def get_password_hash(password: str) -> str:
     """Хеширует пароль с использованием bcrypt."""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed_password = bcrypt.hashpw(password_bytes, salt)
     return hashed_password.decode('utf-8')
 
+@BCRYPT_LATENCY.labels("verify").time()
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяет, совпадает ли пароль с хешем."""
     password_bytes = plain_password.encode('utf-8')
     hashed_password_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(password_bytes, hashed_password_bytes)
 
+# bcrypt отпускает GIL, поэтому отдельный пул потоков разгружает event loop.
+# Семафор ограничивает и работающие, и ожидающие хеширования.
+_bcrypt_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_THREADS, thread_name_prefix="bcrypt")
+_bcrypt_slots = asyncio.Semaphore(settings.BCRYPT_THREADS + settings.BCRYPT_QUEUE_SIZE)
+
+async def _run_bcrypt(func, *args):
+    if _bcrypt_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, попробуйте позже",
+            headers={"Retry-After": "1"},
+        )
+    async with _bcrypt_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_bcrypt_executor, func, *args)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash в пуле потоков bcrypt."""
+    return await _run_bcrypt(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password в пуле потоков bcrypt."""
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
 SECRET_KEY = "my_super_secret_key_that_should_be_in_env_file"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 # Время жизни токена в минутах
@@ -29,8 +60,11 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
-    """Проверяет токен и возвращает email, если токен валиден."""
+def verify_token(token: str) -> tuple[str, int | None]:
+    """
+    Проверяет токен и возвращает (email, id пользователя), если токен валиден.
+    В токенах, выпущенных до добавления uid, id будет None.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Не удалось проверить учетные данные",
@@ -41,6 +75,6 @@ def verify_token(token: str):
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        return email
+        return email, payload.get("uid")
     except JWTError:
         raise credentials_exception
\ No newline at end of file
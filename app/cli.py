@@ -0,0 +1,96 @@
+"""
+Служебные команды для обслуживания БД.
+
+    python -m app.cli rollups-backfill   # пересобрать daily_rollups из transactions и отцепленных партиций
+    python -m app.cli rollups-check      # сверить роллапы с сырыми суммами
+    python -m app.cli partitions-create --months-ahead 3
+    python -m app.cli partitions-detach --keep-months 24 [--archive] [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date
+
+from app.database import new_session
+from app.dao.dao import DailyRollupDAO, TransactionPartitionDAO
+from app.services.analytics import add_months
+
+
+async def rollups_backfill(args) -> int:
+    async with new_session() as session:
+        await DailyRollupDAO.backfill(session)
+    print("Роллапы пересобраны ✅")
+    return 0
+
+
+async def rollups_check(args) -> int:
+    async with new_session() as session:
+        mismatches = await DailyRollupDAO.find_mismatches(session)
+    if not mismatches:
+        print("Роллапы совпадают с транзакциями ✅")
+        return 0
+    for row in mismatches:
+        print(
+            f"[{row.source}] user={row.user_id} category={row.category_id} "
+            f"day={row.day} type={row.type} sum_minor={row.total_minor} count={row.count}"
+        )
+    print(f"❌ Найдено расхождений: {len(mismatches)}")
+    return 1
+
+
+async def partitions_create(args) -> int:
+    """Создает недостающие партиции от текущего месяца на months_ahead вперед."""
+    current_month = date.today().replace(day=1)
+    async with new_session() as session:
+        existing = set(await TransactionPartitionDAO.list_months(session))
+        for i in range(args.months_ahead + 1):
+            month = add_months(current_month, i)
+            if month in existing:
+                continue
+            await TransactionPartitionDAO.create_month(session, month, add_months(month, 1))
+            print(f"Создана партиция {TransactionPartitionDAO.partition_name(month)}")
+    print("Партиции на будущее готовы ✅")
+    return 0
+
+
+async def partitions_detach(args) -> int:
+    """Отцепляет (или переносит в схему archive) партиции старше keep_months месяцев."""
+    boundary = add_months(date.today().replace(day=1), -args.keep_months)
+    async with new_session() as session:
+        old = [m for m in await TransactionPartitionDAO.list_months(session) if m < boundary]
+        for month in old:
+            name = TransactionPartitionDAO.partition_name(month)
+            if args.dry_run:
+                print(f"Будет отцеплена партиция {name}")
+                continue
+            await TransactionPartitionDAO.detach_month(session, month, archive=args.archive)
+            print(f"Отцеплена партиция {name}" + (" (перенесена в archive)" if args.archive else ""))
+    if not old:
+        print(f"Партиций старше {boundary:%Y-%m} нет ✅")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("rollups-backfill").set_defaults(handler=rollups_backfill)
+    commands.add_parser("rollups-check").set_defaults(handler=rollups_check)
+
+    create = commands.add_parser("partitions-create")
+    create.add_argument("--months-ahead", type=int, default=3)
+    create.set_defaults(handler=partitions_create)
+
+    detach = commands.add_parser("partitions-detach")
+    # Без значения по умолчанию: сколько хранить — решение, а не настройка
+    detach.add_argument("--keep-months", type=int, required=True)
+    detach.add_argument("--archive", action="store_true", help="перенести отцепленные таблицы в схему archive")
+    detach.add_argument("--dry-run", action="store_true")
+    detach.set_defaults(handler=partitions_detach)
+
+    args = parser.parse_args()
+    sys.exit(asyncio.run(args.handler(args)))
+
+
+if __name__ == "__main__":
+    main()
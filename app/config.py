@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
 
@@ -8,9 +9,68 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_NAME: str
 
+    # Пул соединений и логирование SQL
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_ECHO: bool | Literal["debug"] = False
+
+    # Реплики для тяжелых чтений: URL через запятую (postgresql+asyncpg://...)
+    DB_REPLICA_URLS: str = ""
+    # Сколько секунд не ходить в реплику после ошибки подключения
+    DB_REPLICA_RETRY_SECONDS: float = 30
+    # Таймаут подключения к реплике: недоступная реплика не должна держать запрос по 60 с (умолчание asyncpg)
+    DB_REPLICA_CONNECT_TIMEOUT: float = 2
+    # Read-your-writes: сколько секунд после записи читать пользователя с primary (0 — выкл.)
+    DB_READ_YOUR_WRITES_SECONDS: float = 5
+
+    # bcrypt: стоимость хеша и размер пула потоков под него
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_THREADS: int = 4
+    BCRYPT_QUEUE_SIZE: int = 32
+
+    # Рендер диаграмм в пуле процессов
+    CHART_WORKERS: int = 2
+    CHART_QUEUE_SIZE: int = 8
+    CHART_RENDER_TIMEOUT: float = 10.0
+
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Токен для /internal/* и /metrics: Authorization: Bearer <токен> или X-Internal-Token.
+    # Пустой — внутренние эндпоинты закрыты для всех
+    INTERNAL_TOKEN: str = ""
+
+    # Кеш пользователей для get_current_user
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_REDIS: bool = False
+
+    # Кеш готовых PNG: LRU в процессе + Redis
+    CHART_CACHE_TTL: int = 3600
+    CHART_CACHE_LRU_BYTES: int = 32 * 1024 * 1024
+    CHART_CACHE_MAX_ITEM_BYTES: int = 512 * 1024
+
+    # Фоновые выгрузки (python -m app.worker)
+    EXPORT_WORKER_CONCURRENCY: int = 2
+    EXPORT_QUEUE_MAX: int = 1000
+    EXPORT_MAX_ACTIVE_PER_USER: int = 3
+    EXPORT_MAX_ATTEMPTS: int = 3
+    EXPORT_RETRY_BACKOFF: float = 5.0
+    EXPORT_JOB_TIMEOUT: float = 300.0
+    # Сколько живут готовый файл и статус завершенной задачи
+    EXPORT_RESULT_TTL: int = 3600
+    EXPORT_MAX_DAYS: int = 366
+
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+    @property
+    def REPLICA_URLS(self) -> list[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
     
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -1,13 +1,17 @@
-from sqlalchemy import select, and_, func
+import re
+from sqlalchemy import select, update, and_, func, tuple_, delete, cast, case, text, table, column, BigInteger, Date, DateTime, Float, literal, literal_column, union_all
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
+from datetime import date, datetime, timedelta
 
-from app.models import User, Category, Transaction
+from app.models import User, Category, Transaction, DailyRollup
 from app.schemas.user import SUserRegister
 from app.schemas.category import SCategoryCreate, SCategoryUpdate
-from app.schemas.transaction import STransactionCreate
-from app.auth import get_password_hash
+from app.schemas.transaction import STransactionCreate, TransactionType, Granularity, from_minor
+from app.auth import get_password_hash_async
+from app.services.metrics import track_dao
 
+@track_dao
 class UserDAO:
     @classmethod
     async def find_by_email(cls, session: AsyncSession, email: str):
@@ -17,21 +21,21 @@ class UserDAO:
 
     @classmethod
     async def create(cls, session: AsyncSession, user_in: SUserRegister):
-        hashed_pw = get_password_hash(user_in.password)
-        new_user = User(email=user_in.email, hashed_password=hashed_pw)
-        session.add(new_user)
+        hashed_pw = await get_password_hash_async(user_in.password)
+        # INSERT ... RETURNING: id и created_at приходят сразу, без refresh
+        query = insert(User).values(email=user_in.email, hashed_password=hashed_pw).returning(User)
+        new_user = await session.scalar(query)
         await session.commit()
-        await session.refresh(new_user)
         return new_user
 
 
+@track_dao
 class CategoryDAO:
     @classmethod
     async def create(cls, session: AsyncSession, category_in: SCategoryCreate, user: User):
-        new_category = Category(name=category_in.name, user_id=user.id)
-        session.add(new_category)
+        query = insert(Category).values(name=category_in.name, user_id=user.id).returning(Category)
+        new_category = await session.scalar(query)
         await session.commit()
-        await session.refresh(new_category)
         return new_category
 
     @classmethod
@@ -40,105 +44,483 @@ class CategoryDAO:
         result = await session.execute(query)
         return result.scalars().all()
 
-    # --- ВОТ ЭТОТ МЕТОД БЫЛ ПОТЕРЯН ---
     @classmethod
-    async def update(cls, session: AsyncSession, category_id: int, category_in: SCategoryUpdate, user: User):
-        # Ищем категорию, которая принадлежит именно этому юзеру
-        query = select(Category).where(
-            and_(Category.id == category_id, Category.user_id == user.id)
+    async def find_owned_ids(cls, session: AsyncSession, user: User, category_ids: set[int]) -> set[int]:
+        """Какие из переданных id категорий принадлежат пользователю."""
+        if not category_ids:
+            return set()
+        query = select(Category.id).where(
+            and_(Category.user_id == user.id, Category.id.in_(category_ids))
         )
         result = await session.execute(query)
-        category = result.scalar_one_or_none()
-        
+        return set(result.scalars().all())
+
+    @classmethod
+    async def update(cls, session: AsyncSession, category_id: int, category_in: SCategoryUpdate, user: User):
+        # Один UPDATE: обновится только категория, которая принадлежит именно этому юзеру
+        query = (
+            update(Category)
+            .where(and_(Category.id == category_id, Category.user_id == user.id))
+            .values(name=category_in.name)
+            .returning(Category)
+        )
+        category = await session.scalar(query)
         if not category:
             return None
-        
-        # Обновляем имя
-        category.name = category_in.name
         await session.commit()
-        await session.refresh(category)
         return category
 
 
+@track_dao
+class DailyRollupDAO:
+    UPSERT_CHUNK = 5000
+
+    @classmethod
+    async def apply(cls, session: AsyncSession, user_id: int, transactions: list, sign: int = 1):
+        """
+        Прибавляет транзакции к дневным роллапам (sign=-1 — вычитает).
+        Транзакции — любые объекты с amount_minor, category_id, transaction_date и type.
+        Не коммитит: вызывается внутри транзакции того, кто меняет transactions.
+        """
+        deltas: dict[tuple, list] = {}
+        for transaction in transactions:
+            key = (transaction.transaction_date.date(), transaction.category_id, TransactionType(transaction.type).value)
+            delta = deltas.setdefault(key, [0, 0])
+            delta[0] += sign * transaction.amount_minor
+            delta[1] += sign
+        if not deltas:
+            return
+
+        # Сортировка ключей — одинаковый порядок блокировок у параллельных вставок
+        rows = [
+            {
+                "user_id": user_id,
+                "day": day,
+                "category_id": category_id,
+                "type": type_,
+                "total_minor": amount_minor,
+                "count": count
+            }
+            for (day, category_id, type_), (amount_minor, count) in sorted(deltas.items())
+        ]
+        # 6 параметров на ключ, а у asyncpg предел 32767 на запрос — режем на пачки
+        for start in range(0, len(rows), cls.UPSERT_CHUNK):
+            query = insert(DailyRollup).values(rows[start:start + cls.UPSERT_CHUNK])
+            query = query.on_conflict_do_update(
+                index_elements=[DailyRollup.user_id, DailyRollup.day, DailyRollup.category_id, DailyRollup.type],
+                set_={
+                    "total_minor": DailyRollup.total_minor + query.excluded.total_minor,
+                    "count": DailyRollup.count + query.excluded.count
+                }
+            )
+            await session.execute(query)
+
+    @classmethod
+    async def _raw_totals(cls, session: AsyncSession):
+        """
+        Агрегат по сырым транзакциям в разрезе ключа роллапа.
+        Вместе с transactions читаются отцепленные партиции (и из схемы archive):
+        роллапы за эти месяцы остаются в статистике, поэтому и пересобирать, и сверять
+        их нужно по тем же строкам.
+        """
+        names = ("id", "user_id", "category_id", "transaction_date", "type", "amount_minor")
+        sources = [select(*(Transaction.__table__.c[name] for name in names))]
+        for schema, table_name in await TransactionPartitionDAO.list_detached(session):
+            sources.append(select(*(column(name) for name in names)).select_from(table(table_name, schema=schema)))
+        raw = union_all(*sources).subquery("raw")
+
+        day = cast(raw.c.transaction_date, Date)
+        return (
+            select(
+                raw.c.user_id,
+                raw.c.category_id,
+                day.label("day"),
+                raw.c.type,
+                # SUM(bigint) в Postgres — numeric; приводим обратно к типу роллапа
+                cast(func.sum(raw.c.amount_minor), BigInteger).label("total_minor"),
+                func.count(raw.c.id).label("count")
+            )
+            .group_by(raw.c.user_id, raw.c.category_id, day, raw.c.type)
+        )
+
+    @classmethod
+    async def backfill(cls, session: AsyncSession):
+        """Пересобирает все роллапы из transactions и отцепленных партиций."""
+        raw = await cls._raw_totals(session)
+        await session.execute(delete(DailyRollup))
+        await session.execute(
+            insert(DailyRollup).from_select(
+                ["user_id", "category_id", "day", "type", "total_minor", "count"], raw
+            )
+        )
+        await session.commit()
+
+    @classmethod
+    async def find_mismatches(cls, session: AsyncSession):
+        """Возвращает ключи, где роллап расходится с суммой по сырым транзакциям."""
+        raw = await cls._raw_totals(session)
+        # Пустые ключи (после удалений) не считаются расхождением
+        stored = select(
+            DailyRollup.user_id,
+            DailyRollup.category_id,
+            DailyRollup.day,
+            DailyRollup.type,
+            DailyRollup.total_minor,
+            DailyRollup.count
+        ).where(DailyRollup.count != 0)
+        # EXCEPT в обе стороны: строки одного набора, которых нет в другом
+        missing = raw.except_(stored).subquery()
+        extra = stored.except_(raw).subquery()
+        query = union_all(
+            select(missing, literal("raw").label("source")),
+            select(extra, literal("rollup").label("source"))
+        )
+        result = await session.execute(query)
+        return result.all()
+
+
+@track_dao
 class TransactionDAO:
     @classmethod
     async def create(cls, session: AsyncSession, transaction_in: STransactionCreate, user: User):
-        new_transaction = Transaction(
-            amount=transaction_in.amount,
-            description=transaction_in.description,
-            category_id=transaction_in.category_id,
-            transaction_date=transaction_in.transaction_date,
-            user_id=user.id,
-            type=transaction_in.type
-        )
-        session.add(new_transaction)
+        """
+        INSERT ... SELECT ... RETURNING: строка вставится, только если категория
+        принадлежит пользователю. Иначе возвращает None.
+        """
+        values = select(
+            literal(transaction_in.amount_minor, Transaction.amount_minor.type),
+            literal(transaction_in.description, Transaction.description.type),
+            Category.id,
+            literal(transaction_in.transaction_date, Transaction.transaction_date.type),
+            literal(user.id, Transaction.user_id.type),
+            literal(transaction_in.type.value, Transaction.type.type)
+        ).where(
+            and_(Category.id == transaction_in.category_id, Category.user_id == user.id)
+        )
+        query = (
+            insert(Transaction)
+            .from_select(["amount_minor", "description", "category_id", "transaction_date", "user_id", "type"], values)
+            .returning(Transaction)
+        )
+        new_transaction = await session.scalar(query)
+        if new_transaction is None:
+            return None
+        # Роллап обновляется в той же транзакции БД, что и вставка
+        await DailyRollupDAO.apply(session, user.id, [new_transaction])
         await session.commit()
-        await session.refresh(new_transaction)
         return new_transaction
     
     @classmethod
-    async def get_report(cls, session: AsyncSession, user: User, start_date: date, end_date: date):
-        query = select(Transaction).where(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
+    async def create_many(cls, session: AsyncSession, transactions_in: list[STransactionCreate], user: User):
+        """
+        Вставляет все транзакции одной транзакцией БД: многострочные INSERT ... RETURNING
+        (SQLAlchemy сам режет их на пачки) плюс одно обновление роллапов.
+        Возвращает id в порядке входных строк.
+        """
+        rows = [
+            {
+                "amount_minor": item.amount_minor,
+                "description": item.description,
+                "category_id": item.category_id,
+                "transaction_date": item.transaction_date,
+                "user_id": user.id,
+                "type": item.type
+            }
+            for item in transactions_in
+        ]
+        query = insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True)
+        result = await session.execute(query, rows)
+        ids = list(result.scalars().all())
+        await DailyRollupDAO.apply(session, user.id, transactions_in)
+        await session.commit()
+        return ids
+    
+    @classmethod
+    async def get_report(
+        cls,
+        session: AsyncSession,
+        user: User,
+        start_date: date,
+        end_date: date,
+        limit: int,
+        after: tuple[datetime, int] | None = None
+    ):
+        """
+        Страница отчета, упорядоченная по (transaction_date, id).
+        after — ключ последней строки предыдущей страницы (keyset-пагинация).
+        Выбираются только нужные колонки и возвращаются словари: без ORM-объектов
+        и identity map, amount сразу float из копеек — строки можно отдавать в JSON как есть.
+        Период [start_date, end_date] включает весь день end_date — как у роллапов в get_summary.
+        """
+        conditions = [
+            Transaction.user_id == user.id,
+            Transaction.transaction_date >= start_date,
+            # transaction_date — timestamp: "<= end_date" отрезал бы все после полуночи
+            Transaction.transaction_date < end_date + timedelta(days=1)
+        ]
+        if after is not None:
+            conditions.append(tuple_(Transaction.transaction_date, Transaction.id) > tuple_(*after))
+        query = (
+            select(
+                Transaction.id,
+                (cast(Transaction.amount_minor, Float) / 100).label("amount"),
+                Transaction.amount_minor,
+                Transaction.description,
+                Transaction.transaction_date,
+                Transaction.created_at,
+                Transaction.category_id,
+                Transaction.type
             )
+            .where(and_(*conditions))
+            .order_by(Transaction.transaction_date, Transaction.id)
+            .limit(limit)
         )
         result = await session.execute(query)
-        return result.scalars().all()
+        keys = list(result.keys())
+        return [dict(zip(keys, row)) for row in result]
 
     @classmethod
-    async def get_stats(cls, session: AsyncSession, user: User, start_date: date, end_date: date):
-        # Доходы
-        query_income = select(func.sum(Transaction.amount)).where(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date,
-                Transaction.type == "income"
+    async def get_summary(cls, session: AsyncSession, user: User, start_date: date, end_date: date):
+        """
+        Доходы, расходы, баланс, количество и разбивка по категориям за один запрос.
+        Читает дневные роллапы, а не сырые транзакции: стоимость зависит от числа дней.
+        GROUPING SETS дает строки по каждой категории и одну итоговую строку.
+        """
+        # Суммы в копейках: SUM(bigint) точен, а cast избавляет от Decimal на стороне Python
+        income = cast(func.coalesce(func.sum(DailyRollup.total_minor).filter(DailyRollup.type == "income"), 0), BigInteger)
+        expense = cast(func.coalesce(func.sum(DailyRollup.total_minor).filter(DailyRollup.type == "expense"), 0), BigInteger)
+        query = (
+            select(
+                Category.id,
+                Category.name,
+                func.grouping(Category.id).label("is_total"),
+                income.label("total_income"),
+                expense.label("total_expense"),
+                func.coalesce(func.sum(DailyRollup.count), 0).label("count")
             )
+            .join(Category, DailyRollup.category_id == Category.id)
+            .where(
+                and_(
+                    DailyRollup.user_id == user.id,
+                    DailyRollup.day >= start_date,
+                    DailyRollup.day <= end_date
+                )
+            )
+            .group_by(func.grouping_sets(tuple_(Category.id, Category.name), tuple_()))
+            # Ключи, обнуленные удалениями, в разбивку не попадают
+            .having(func.sum(DailyRollup.count) != 0)
         )
-        result_income = await session.execute(query_income)
-        income_val = result_income.scalar()
-        total_income = float(income_val) if income_val else 0.0
-
-        # Расходы
-        query_expense = select(func.sum(Transaction.amount)).where(
-            and_(
-                Transaction.user_id == user.id,
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date,
-                Transaction.type == "expense"
+        result = await session.execute(query)
+
+        summary = {
+            "total_income": 0.0, "total_expense": 0.0, "balance": 0.0,
+            "total_income_minor": 0, "total_expense_minor": 0, "balance_minor": 0,
+            "count": 0, "categories": []
+        }
+        for row in result.all():
+            if row.is_total:
+                # Баланс считаем в целых, в рубли переводим только на выходе
+                balance_minor = row.total_income - row.total_expense
+                summary.update({
+                    "total_income": from_minor(row.total_income),
+                    "total_expense": from_minor(row.total_expense),
+                    "balance": from_minor(balance_minor),
+                    "total_income_minor": row.total_income,
+                    "total_expense_minor": row.total_expense,
+                    "balance_minor": balance_minor,
+                    "count": row.count
+                })
+            else:
+                summary["categories"].append({
+                    "category_id": row.id,
+                    "name": row.name,
+                    "total_income": from_minor(row.total_income),
+                    "total_expense": from_minor(row.total_expense),
+                    "total_income_minor": row.total_income,
+                    "total_expense_minor": row.total_expense,
+                    "count": row.count
+                })
+        return summary
+
+    @classmethod
+    async def get_timeseries(
+        cls, session: AsyncSession, user: User, start_date: date, end_date: date, granularity: Granularity
+    ):
+        """
+        Доходы, расходы, чистый поток и баланс по периодам одним запросом из роллапов.
+        generate_series дает все периоды (пустые — нулями), оконная сумма — нарастающий баланс,
+        к которому прибавляется баланс на начало (все операции до start_date).
+        """
+        unit = granularity.value
+        # Явно в timestamp: date_trunc от date иначе уходит в timestamptz
+        start = func.date_trunc(unit, cast(start_date, DateTime))
+        end = func.date_trunc(unit, cast(end_date, DateTime))
+        buckets = select(
+            func.generate_series(start, end, literal_column(f"interval '1 {unit}'")).label("bucket")
+        ).subquery()
+
+        signed_amount = case(
+            (DailyRollup.type == "income", DailyRollup.total_minor),
+            else_=-DailyRollup.total_minor
+        )
+        bucket = func.date_trunc(unit, cast(DailyRollup.day, DateTime))
+        # Все суммы в копейках; SUM(bigint) возвращает numeric — приводим обратно к bigint
+        totals = (
+            select(
+                bucket.label("bucket"),
+                cast(func.sum(DailyRollup.total_minor).filter(DailyRollup.type == "income"), BigInteger).label("total_income"),
+                cast(func.sum(DailyRollup.total_minor).filter(DailyRollup.type == "expense"), BigInteger).label("total_expense"),
+                cast(func.sum(signed_amount), BigInteger).label("net")
             )
+            .where(
+                and_(
+                    DailyRollup.user_id == user.id,
+                    DailyRollup.day >= start_date,
+                    DailyRollup.day <= end_date
+                )
+            )
+            .group_by(bucket)
+            .subquery()
+        )
+        opening = (
+            select(cast(func.coalesce(func.sum(signed_amount), 0), BigInteger))
+            .where(and_(DailyRollup.user_id == user.id, DailyRollup.day < start_date))
+            .scalar_subquery()
+        )
+
+        net = func.coalesce(totals.c.net, 0)
+        query = (
+            select(
+                cast(buckets.c.bucket, Date).label("bucket"),
+                func.coalesce(totals.c.total_income, 0).label("total_income"),
+                func.coalesce(totals.c.total_expense, 0).label("total_expense"),
+                net.label("net"),
+                cast(opening + func.sum(net).over(order_by=buckets.c.bucket), BigInteger).label("balance")
+            )
+            .select_from(buckets.outerjoin(totals, buckets.c.bucket == totals.c.bucket))
+            .order_by(buckets.c.bucket)
         )
-        result_expense = await session.execute(query_expense)
-        expense_val = result_expense.scalar()
-        total_expense = float(expense_val) if expense_val else 0.0
+        result = await session.execute(query)
+        rows = result.all()
 
         return {
-            "total_income": total_income,
-            "total_expense": total_expense,
-            "balance": total_income - total_expense
+            "granularity": granularity,
+            # Баланс на начало = баланс после первого периода минус его чистый поток
+            "opening_balance": from_minor(rows[0].balance - rows[0].net) if rows else 0.0,
+            "points": [
+                {
+                    "bucket": row.bucket,
+                    "total_income": from_minor(row.total_income),
+                    "total_expense": from_minor(row.total_expense),
+                    "net": from_minor(row.net),
+                    "balance": from_minor(row.balance)
+                }
+                for row in rows
+            ]
         }
 
     @classmethod
-    async def get_statistics(cls, session: AsyncSession, user: User, start_date: date, end_date: date):
+    async def get_monthly_expenses(cls, session: AsyncSession, user: User, start_month: date, end_month: date):
+        """Расходы по (категория, месяц) в [start_month, end_month) — колонки для аналитики."""
+        month = cast(func.date_trunc("month", cast(DailyRollup.day, DateTime)), Date)
         query = (
             select(
+                Category.id,
                 Category.name,
-                func.sum(Transaction.amount).label("total_amount")
+                month.label("month"),
+                (cast(func.sum(DailyRollup.total_minor), Float) / 100).label("amount")
             )
-            .join(Category, Transaction.category_id == Category.id)
+            .join(Category, DailyRollup.category_id == Category.id)
             .where(
                 and_(
-                    Transaction.user_id == user.id,
-                    Transaction.transaction_date >= start_date,
-                    Transaction.transaction_date <= end_date,
-                    Transaction.type == "expense"
+                    DailyRollup.user_id == user.id,
+                    DailyRollup.type == "expense",
+                    DailyRollup.day >= start_month,
+                    DailyRollup.day < end_month
                 )
             )
-            .group_by(Category.name)
+            .group_by(Category.id, Category.name, month)
         )
         result = await session.execute(query)
-        return result.all()
\ No newline at end of file
+        return result.all()
+
+
+@track_dao
+class TransactionPartitionDAO:
+    """Помесячные партиции transactions (transactions_pYYYY_MM) и DEFAULT-партиция для остального."""
+    PREFIX = "transactions_p"
+    NAME_RE = re.compile(r"^transactions_p(\d{4})_(\d{2})$")
+    ARCHIVE_SCHEMA = "archive"
+
+    @classmethod
+    def partition_name(cls, month: date) -> str:
+        return f"{cls.PREFIX}{month:%Y_%m}"
+
+    @classmethod
+    async def list_months(cls, session: AsyncSession) -> list[date]:
+        """Месяцы, для которых есть партиции, по возрастанию."""
+        result = await session.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'transactions'::regclass"
+            )
+        )
+        months = []
+        for name in result.scalars():
+            match = cls.NAME_RE.match(name)
+            if match:
+                months.append(date(int(match[1]), int(match[2]), 1))
+        return sorted(months)
+
+    @classmethod
+    async def list_detached(cls, session: AsyncSession) -> list[tuple[str, str]]:
+        """(схема, таблица) партиций, отцепленных partitions-detach, — в public или в archive."""
+        result = await session.execute(
+            text(
+                "SELECT n.nspname, c.relname FROM pg_class c "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE c.relkind = 'r' AND NOT c.relispartition "
+                "AND n.nspname IN ('public', :archive) AND c.relname LIKE :prefix"
+            ),
+            {"archive": cls.ARCHIVE_SCHEMA, "prefix": cls.PREFIX + "%"}
+        )
+        return sorted((schema, name) for schema, name in result.all() if cls.NAME_RE.match(name))
+
+    @classmethod
+    async def create_month(cls, session: AsyncSession, month: date, next_month: date):
+        """
+        Создает партицию через ATTACH: строки этого месяца, уже попавшие в DEFAULT,
+        переносятся в новую таблицу, иначе Postgres отказал бы в создании партиции.
+        """
+        name = cls.partition_name(month)
+        await session.execute(text(f'CREATE TABLE "{name}" (LIKE transactions INCLUDING DEFAULTS)'))
+        await session.execute(
+            text(
+                f'WITH moved AS (DELETE FROM transactions_default '
+                f'WHERE transaction_date >= :start AND transaction_date < :end RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved'
+            ),
+            # transaction_date — timestamp: asyncpg не примет для него date
+            {"start": datetime(month.year, month.month, 1), "end": datetime(next_month.year, next_month.month, 1)}
+        )
+        await session.execute(
+            text(
+                f"ALTER TABLE transactions ATTACH PARTITION \"{name}\" "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            )
+        )
+        await session.commit()
+
+    @classmethod
+    async def detach_month(cls, session: AsyncSession, month: date, archive: bool = False):
+        """
+        Отцепляет партицию: таблица с данными остается, но в запросы к transactions больше не попадает.
+        archive=True переносит ее в схему archive. Роллапы не трогаем — статистика за месяц сохраняется.
+        """
+        name = cls.partition_name(month)
+        await session.execute(text(f'ALTER TABLE transactions DETACH PARTITION "{name}"'))
+        if archive:
+            await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {cls.ARCHIVE_SCHEMA}"))
+            await session.execute(text(f'ALTER TABLE "{name}" SET SCHEMA {cls.ARCHIVE_SCHEMA}'))
+        await session.commit()
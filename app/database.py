@@ -1,14 +1,149 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from redis.exceptions import RedisError
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.services.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Счетчики пула соединений и гистограмма времени получения соединения."""
+
+    # Верхние границы корзин в миллисекундах
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.acquired_total = 0
+        self.waited_total = 0
+        self.acquire_counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.acquire_sum_ms = 0.0
+
+    def observe_acquire(self, elapsed_ms: float, had_to_wait: bool):
+        with self._lock:
+            self.acquired_total += 1
+            self.waited_total += had_to_wait
+            self.acquire_sum_ms += elapsed_ms
+            self.acquire_counts[bisect_left(self.BUCKETS_MS, elapsed_ms)] += 1
+
+    def histogram(self) -> dict:
+        labels = [f"le_{bound}ms" for bound in self.BUCKETS_MS] + ["le_inf"]
+        return dict(zip(labels, self.acquire_counts))
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Стандартный пул asyncio, который замеряет, сколько ждали соединение."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        # Ждать придется, если все соединения (включая overflow) уже выданы
+        had_to_wait = self.checkedout() >= self.size() + max(self._max_overflow, 0)
+        self.stats.waiting += 1
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.waiting -= 1
+            self.stats.observe_acquire((time.perf_counter() - start) * 1000, had_to_wait)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+def make_engine(url: str, **connect_args):
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE, **connect_args},
+    )
+
+
+engine = make_engine(settings.DATABASE_URL)
+replica_engines = [
+    make_engine(url, timeout=settings.DB_REPLICA_CONNECT_TIMEOUT) for url in settings.REPLICA_URLS
+]
 
 new_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+
+class ReplicaRouter:
+    """Round-robin по репликам; упавшая реплика пропускается DB_REPLICA_RETRY_SECONDS секунд."""
+
+    def __init__(self, engines: list, retry_after: float):
+        self.retry_after = retry_after
+        self._sessionmakers = [
+            async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+            for replica in engines
+        ]
+        self._down_until = [0.0] * len(engines)
+        self._next = 0
+
+    def candidates(self) -> list[tuple[int, async_sessionmaker]]:
+        """Живые реплики, начиная со следующей по кругу."""
+        count = len(self._sessionmakers)
+        if not count:
+            return []
+        start = self._next
+        self._next = (self._next + 1) % count
+        now = time.monotonic()
+        order = [(start + offset) % count for offset in range(count)]
+        return [(i, self._sessionmakers[i]) for i in order if self._down_until[i] <= now]
+
+    def mark_down(self, index: int):
+        self._down_until[index] = time.monotonic() + self.retry_after
+
+
+replica_router = ReplicaRouter(replica_engines, settings.DB_REPLICA_RETRY_SECONDS)
+
+
+# Read-your-writes: отметка в Redis, чтобы ее видели все воркеры API
+def _read_your_writes_enabled() -> bool:
+    return bool(replica_engines) and settings.DB_READ_YOUR_WRITES_SECONDS > 0
+
+async def mark_user_write(user_id: int):
+    """Вызывать после записи: ближайшие чтения пользователя пойдут в primary."""
+    if not _read_your_writes_enabled():
+        return
+    try:
+        await redis_client.set(
+            f"ryw:{user_id}", 1, px=int(settings.DB_READ_YOUR_WRITES_SECONDS * 1000)
+        )
+    except RedisError as e:
+        logger.warning("Не удалось отметить запись пользователя в Redis: %s", e)
+
+async def wrote_recently(user_id: int) -> bool:
+    if not _read_your_writes_enabled():
+        return False
+    try:
+        return bool(await redis_client.exists(f"ryw:{user_id}"))
+    except RedisError:
+        # Не знаем — читаем с primary, так точно не отдадим устаревшие данные
+        return True
+
+
 class Base(DeclarativeBase):
     pass
 
 async def get_session():
     async with new_session() as session:
-        yield session
\ No newline at end of file
+        yield session
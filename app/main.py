@@ -1,15 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers.auth import router as auth_routers
 from app.routers.user import router as user_routers
 from app.routers.category import router as category_routers 
 from app.routers.transaction import router as transaction_routers
+from app.routers.analytics import router as analytics_routers
+from app.routers.exports import router as exports_routers
+from app.routers.internal import router as internal_routers
+from app.routers.metrics import router as metrics_routers
+from app.services.metrics import MetricsMiddleware
+from app.services.charts import chart_renderer
+from app.services.redis_client import redis_client
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Прогреваем воркеры рендера при старте и гасим их при остановке
+    chart_renderer.start()
+    yield
+    chart_renderer.shutdown()
+    await redis_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth_routers)
 app.include_router(user_routers)
 app.include_router(category_routers)
 app.include_router(transaction_routers)
+app.include_router(analytics_routers)
+app.include_router(exports_routers)
+app.include_router(internal_routers)
+app.include_router(metrics_routers)
 
 @app.get("/")
 async def read_root():
@@ -1,12 +1,14 @@
 from datetime import datetime, date  
 from sqlalchemy import (
+    BigInteger,
     Integer,
     String,
     func,
     DateTime,
     ForeignKey,
-    Numeric,
     Date,
+    Index,
+    PrimaryKeyConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
@@ -28,21 +30,58 @@ class Category(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String, index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     user: Mapped["User"] = relationship(back_populates="categories")
     transactions: Mapped[list["Transaction"]] = relationship(back_populates="category")
 
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Все отчеты фильтруют по пользователю и диапазону дат
+        Index("ix_transactions_user_id_transaction_date", "user_id", "transaction_date"),
+        # Покрывающий индекс для сумм по типу: Postgres не ходит в таблицу (index-only scan)
+        Index(
+            "ix_transactions_user_id_type_transaction_date",
+            "user_id",
+            "type",
+            "transaction_date",
+            postgresql_include=["amount_minor", "category_id"],
+        ),
+        # Помесячные партиции по transaction_date: создает и отцепляет python -m app.cli partitions-*
+        {"postgresql_partition_by": "RANGE (transaction_date)"},
+    )
 
+    # Ключ партиционирования обязан входить в первичный ключ; id по-прежнему уникален (sequence)
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    amount: Mapped[float] = mapped_column(Numeric(10, 2))
+    # Сумма в копейках: целые суммируются точно и быстрее NUMERIC
+    amount_minor: Mapped[int] = mapped_column(BigInteger)
     description: Mapped[str] = mapped_column(String, nullable=True)
-    transaction_date: Mapped[datetime] = mapped_column(DateTime)
+    transaction_date: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
     type: Mapped[str] = mapped_column(String, default="expense", server_default="expense")
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     user: Mapped["User"] = relationship(back_populates="transactions")
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
-    category: Mapped["Category"] = relationship(back_populates="transactions")
\ No newline at end of file
+    category: Mapped["Category"] = relationship(back_populates="transactions")
+
+    @property
+    def amount(self) -> float:
+        """Сумма в рублях — только для ответа API, считать нужно в amount_minor."""
+        return self.amount_minor / 100
+
+
+class DailyRollup(Base):
+    """Суммы и количество транзакций пользователя за день по категории и типу."""
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        # user_id и day первыми: отчеты читают диапазон дней одного пользователя
+        PrimaryKeyConstraint("user_id", "day", "category_id", "type"),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
+    day: Mapped[date] = mapped_column(Date)
+    type: Mapped[str] = mapped_column(String)
+    total_minor: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
\ No newline at end of file
@@ -0,0 +1,51 @@
+import asyncio
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dao.dao import TransactionDAO
+from app.models import User
+from app.routers.auth import get_current_user, get_read_session
+from app.schemas.analytics import SCategoryAnalyticsResponse
+from app.services.analytics import (
+    HISTORY_MONTHS,
+    add_months,
+    build_category_analytics,
+    get_cached,
+    set_cached,
+)
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/categories", response_model=SCategoryAnalyticsResponse)
+async def get_category_analytics(
+    months: int = Query(12, ge=1, le=36),
+    z_threshold: float = Query(2.0, gt=0),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Расходы по категориям за последние months месяцев: скользящие средние за 3 и 12 месяцев,
+    изменение к прошлому месяцу и аномалии (|z-score| >= z_threshold к предыдущим 12 месяцам).
+    """
+    current_month = date.today().replace(day=1)
+    cache_field = f"{current_month:%Y-%m}:{months}:{z_threshold}"
+    cached = await get_cached(current_user.id, cache_field)
+    if cached is not None:
+        return cached
+
+    # Для скользящих за 12 месяцев берем историю и до первого показанного месяца
+    n_months = months + HISTORY_MONTHS
+    first_month = add_months(current_month, -(n_months - 1))
+    # Транзакции будущими датами не попадают в матрицу: она заканчивается текущим месяцем
+    rows = await TransactionDAO.get_monthly_expenses(
+        session, current_user, first_month, add_months(current_month, 1)
+    )
+
+    analytics = await asyncio.to_thread(
+        build_category_analytics, rows, first_month, n_months, months, z_threshold
+    )
+    await set_cached(current_user.id, cache_field, analytics)
+    return analytics
@@ -1,12 +1,15 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_session
+from app.database import get_session, new_session, replica_router, wrote_recently
 from app.dao.dao import UserDAO
 from app.schemas.user import SUserRegister, SUserResponse, SUserLogin, STokenResponse
-from app.auth import verify_password, create_access_token, verify_token
+from app.auth import verify_password_async, create_access_token, verify_token
 from app.models import User
+from app.services.principal_cache import principal_cache
 
 router = APIRouter(prefix="/auth", tags=["Auth & Users"])
 
@@ -45,14 +48,14 @@ async def login_for_access_token(
 ):
     user = await UserDAO.find_by_email(session, form_data.email)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id})
 
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -61,13 +64,55 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session)
 ) -> User:
-    email = verify_token(token)
-    
+    email, user_id = verify_token(token)
+
+    # Сначала кеш: большинству эндпоинтов нужен только id, ходить в БД за ним незачем
+    principal = await principal_cache.get(email)
+    if principal is not None and (user_id is None or principal["id"] == user_id):
+        return User(
+            id=principal["id"],
+            email=principal["email"],
+            created_at=datetime.fromisoformat(principal["created_at"])
+        )
+
     user = await UserDAO.find_by_email(session, email)
-    if not user:
+    # Сразу возвращаем соединение в пул: иначе запрос держит его до конца, а get_read_session
+    # без реплик берет второе из того же пула — под нагрузкой запросы ждут друг друга до pool_timeout.
+    # Сессия остается рабочей: эндпоинт с get_session получит новое соединение при первом запросе
+    await session.close()
+    # Токен от пересозданного с тем же email пользователя считаем недействительным
+    if not user or (user_id is not None and user.id != user_id):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Пользователь не найден",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
\ No newline at end of file
+    await principal_cache.set(email, {
+        "id": user.id,
+        "email": user.email,
+        "created_at": user.created_at.isoformat()
+    })
+    return user
+
+
+async def get_read_session(current_user: User = Depends(get_current_user)):
+    """
+    Сессия для тяжелых чтений: реплика по кругу, primary — если реплик нет,
+    все недоступны или пользователь только что писал (read-your-writes).
+    """
+    if not await wrote_recently(current_user.id):
+        for index, sessionmaker in replica_router.candidates():
+            session = sessionmaker()
+            try:
+                # Берем соединение сразу, чтобы упавшую реплику заметить здесь, а не в эндпоинте
+                await session.connection()
+            except (OSError, TimeoutError, DBAPIError):
+                await session.close()
+                replica_router.mark_down(index)
+                continue
+            async with session:
+                yield session
+            return
+
+    async with new_session() as session:
+        yield session
\ No newline at end of file
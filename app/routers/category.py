@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_session
+from app.database import get_session, mark_user_write
 from app.models import User
-from app.routers.auth import get_current_user 
+from app.routers.auth import get_current_user, get_read_session
 from app.schemas.category import SCategoryCreate, SCategoryResponse
 from app.schemas.category import SCategoryUpdate
 from app.dao.dao import CategoryDAO
+from app.services.analytics import invalidate_user_analytics
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
@@ -16,12 +17,13 @@ async def create_category(
     session: AsyncSession = Depends(get_session)
 ):
     new_category = await CategoryDAO.create(session, category_data, current_user)
+    await mark_user_write(current_user.id)
     return new_category
 
 @router.get("/", response_model=list[SCategoryResponse])
 async def get_user_categories(
     current_user: User = Depends(get_current_user), 
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     categories = await CategoryDAO.find_all_by_user(session, current_user)
     return categories
@@ -36,4 +38,7 @@ async def update_category(
     updated_category = await CategoryDAO.update(session, category_id, category_data, current_user)
     if not updated_category:
         raise HTTPException(status_code=404, detail="Категория не найдена или доступ запрещен")
+    await mark_user_write(current_user.id)
+    # В кеше аналитики лежат названия категорий
+    await invalidate_user_analytics(current_user.id)
     return updated_category
\ No newline at end of file
@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.models import User
+from app.routers.auth import get_current_user
+from app.schemas.export import ExportStatus, SExportCreate, SExportResponse
+from app.services.exports import (
+    ExportLimitExceeded,
+    ExportQueueFull,
+    enqueue_export,
+    get_job,
+    get_result,
+)
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+def redis_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Очередь выгрузок недоступна, попробуйте позже",
+        headers={"Retry-After": "5"},
+    )
+
+
+def to_response(job: dict) -> dict:
+    download_url = None
+    if job["status"] == ExportStatus.done.value:
+        download_url = router.url_path_for("download_export", job_id=job["id"])
+    return {**job, "download_url": download_url}
+
+
+async def get_owned_job(job_id: str, user: User) -> dict:
+    try:
+        job = await get_job(job_id)
+    except RedisError:
+        raise redis_unavailable()
+    # Чужую задачу не отличаем от несуществующей
+    if job is None or job["user_id"] != user.id:
+        raise HTTPException(status_code=404, detail="Выгрузка не найдена или истекла")
+    return job
+
+
+@router.post("/", response_model=SExportResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_export(
+    export_in: SExportCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Ставит выгрузку в очередь. Статус — GET /exports/{id}, файл — GET /exports/{id}/download."""
+    if export_in.end_date < export_in.start_date:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="end_date раньше start_date")
+    if (export_in.end_date - export_in.start_date).days >= settings.EXPORT_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Период выгрузки не больше {settings.EXPORT_MAX_DAYS} дней"
+        )
+    try:
+        job = await enqueue_export(current_user.id, export_in.format, export_in.start_date, export_in.end_date)
+    except ExportLimitExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Не больше {settings.EXPORT_MAX_ACTIVE_PER_USER} выгрузок одновременно"
+        )
+    except ExportQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Очередь выгрузок переполнена, попробуйте позже",
+            headers={"Retry-After": "30"},
+        )
+    except RedisError:
+        raise redis_unavailable()
+    return to_response(job)
+
+
+@router.get("/{job_id}", response_model=SExportResponse)
+async def get_export(job_id: str, current_user: User = Depends(get_current_user)):
+    return to_response(await get_owned_job(job_id, current_user))
+
+
+@router.get("/{job_id}/download", response_class=Response, name="download_export")
+async def download_export(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await get_owned_job(job_id, current_user)
+    if job["status"] != ExportStatus.done.value:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Выгрузка еще не готова")
+    try:
+        content = await get_result(job_id)
+    except RedisError:
+        raise redis_unavailable()
+    if content is None:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Срок хранения выгрузки истек")
+    return Response(
+        content=content,
+        media_type=job["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="{job["filename"]}"'},
+    )
@@ -0,0 +1,53 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.config import settings
+from app.database import engine, replica_engines
+
+
+async def require_internal_token(
+    authorization: str | None = Header(None),
+    x_internal_token: str | None = Header(None),
+):
+    """Пускает только с INTERNAL_TOKEN: служебные данные не должны быть видны пользователям API."""
+    token = x_internal_token
+    if token is None and authorization is not None:
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials.strip()
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Нужен служебный токен",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # compare_digest — время сравнения не подсказывает, сколько символов совпало
+    if not settings.INTERNAL_TOKEN or not secrets.compare_digest(token.encode(), settings.INTERNAL_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Неверный служебный токен")
+
+
+router = APIRouter(prefix="/internal", tags=["Internal"], dependencies=[Depends(require_internal_token)])
+
+
+def pool_status(pool) -> dict:
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "waiting": stats.waiting,
+        "acquired_total": stats.acquired_total,
+        "waited_total": stats.waited_total,
+        "acquire_ms_sum": round(stats.acquire_sum_ms, 3),
+        "acquire_ms_histogram": stats.histogram(),
+    }
+
+
+@router.get("/pool")
+async def get_pool_status():
+    """Состояние пулов соединений с БД. Только с INTERNAL_TOKEN."""
+    status = pool_status(engine.sync_engine.pool)
+    status["replicas"] = [pool_status(replica.sync_engine.pool) for replica in replica_engines]
+    return status
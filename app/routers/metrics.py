@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.routers.internal import require_internal_token
+from app.services.metrics import render_metrics
+
+router = APIRouter(tags=["Internal"], dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Метрики в формате Prometheus. Только с INTERNAL_TOKEN (в Prometheus — authorization.credentials)."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -1,18 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
-from app.schemas.transaction import STransactionCreate, STransactionResponse, SStatsResponse
-from fastapi.responses import StreamingResponse
-from app.services.charts import generate_pie_chart
+from datetime import date, datetime
+import base64
+import csv
+import io
+import json
+from app.schemas.transaction import STransactionCreate, STransactionResponse, SStatsResponse, SSummaryResponse, STransactionPage
+from app.schemas.transaction import SBulkResponse, SBulkRowResult
+from app.schemas.transaction import ChartFormat, Granularity, STimeseriesResponse
+from fastapi.responses import ORJSONResponse, Response
+from app.services.charts import chart_renderer, ChartRendererBusy, ChartRendererCrashed, ChartRenderTimeout
+from app.services.chart_cache import chart_cache, chart_key
+from app.services.svg_chart import render_pie_svg
+from app.services.analytics import invalidate_user_analytics
 
-from app.database import get_session
+from app.database import get_session, mark_user_write
 from app.models import User
-from app.routers.auth import get_current_user
+from app.routers.auth import get_current_user, get_read_session
 from app.schemas.transaction import STransactionCreate, STransactionResponse
-from app.dao.dao import TransactionDAO
+from app.dao.dao import TransactionDAO, CategoryDAO
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
+REPORT_PAGE_LIMIT = 1000
+BULK_MAX_ROWS = 10_000
+# С запасом на BULK_MAX_ROWS строк с описаниями; больше — отказ до чтения тела в память
+BULK_MAX_BYTES = 8 * 1024 * 1024
+TIMESERIES_MAX_POINTS = 2000
+# Примерная длина периода в днях — для проверки размера ответа
+GRANULARITY_DAYS = {Granularity.day: 1, Granularity.week: 7, Granularity.month: 28}
+
+
+def encode_cursor(transaction_date: datetime, transaction_id: int) -> str:
+    """Курсор — непрозрачная строка с ключом (transaction_date, id) последней строки."""
+    raw = f"{transaction_date.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        date_part, id_part = raw.split("|")
+        transaction_date = datetime.fromisoformat(date_part)
+        # transaction_date хранится без зоны: сравнение с aware-датой падает в БД (500)
+        if transaction_date.tzinfo is not None:
+            raise ValueError("курсор с часовым поясом")
+        return transaction_date, int(id_part)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный курсор")
+
+async def read_body_limited(request: Request, limit: int) -> bytes:
+    """Тело запроса не больше limit байт: по Content-Length сразу, иначе — по мере чтения потока."""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Тело запроса больше {limit // (1024 * 1024)} МБ"
+    )
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    body = bytearray()
+    # Content-Length может не быть (chunked) или он может врать — считаем прочитанное
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+def parse_bulk_rows(content_type: str, body: bytes) -> list:
+    """Строки импорта из JSON-массива или CSV (с заголовком amount,category_id,transaction_date,type,description)."""
+    if content_type.startswith("text/csv"):
+        try:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            # Пустая ячейка — это отсутствующее значение
+            return [{key: value or None for key, value in row.items()} for row in reader]
+        except (UnicodeDecodeError, csv.Error):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный CSV")
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный JSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Ожидается массив транзакций")
+    return rows
+
+def negotiate_chart_format(chart_format: ChartFormat | None, accept: str | None) -> ChartFormat:
+    """
+    ?format= важнее Accept. SVG отдаем, только если клиент просит его не хуже PNG:
+    по умолчанию остается PNG, как раньше (бот отправляет диаграмму как фото).
+    """
+    if chart_format is not None:
+        return chart_format
+    quality = {}
+    for part in (accept or "").split(","):
+        media, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        quality[media] = max(q, quality.get(media, 0.0))
+    svg_q = quality.get("image/svg+xml", 0.0)
+    if svg_q > 0 and svg_q >= quality.get("image/png", 0.0):
+        return ChartFormat.svg
+    return ChartFormat.png
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
 @router.post("/", response_model=STransactionResponse)
 async def create_transaction(
     transaction_data: STransactionCreate,
@@ -20,53 +119,180 @@ async def create_transaction(
     session: AsyncSession = Depends(get_session)
 ):
     new_transaction = await TransactionDAO.create(session, transaction_data, current_user)
+    if not new_transaction:
+        raise HTTPException(status_code=404, detail="Категория не найдена или доступ запрещен")
+    await mark_user_write(current_user.id)
+    await invalidate_user_analytics(current_user.id)
     return new_transaction
 
-@router.get("/graph", response_class=StreamingResponse)
+@router.post("/bulk", response_model=SBulkResponse)
+async def create_transactions_bulk(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Импорт пачки транзакций: JSON-массив или CSV (Content-Type: text/csv).
+    Сначала проверяются все строки, и только если ошибок нет — всё вставляется одной транзакцией.
+    """
+    body = await read_body_limited(request, BULK_MAX_BYTES)
+    rows = parse_bulk_rows(request.headers.get("content-type", ""), body)
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Нет строк для импорта")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Не больше {BULK_MAX_ROWS} строк за раз"
+        )
+
+    # 1. Валидация каждой строки схемой
+    results = []
+    valid = []
+    for row_number, raw in enumerate(rows, start=1):
+        result = SBulkRowResult(row=row_number)
+        results.append(result)
+        try:
+            valid.append((result, STransactionCreate.model_validate(raw)))
+        except ValidationError as e:
+            result.errors = [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+
+    # 2. Все категории должны принадлежать пользователю (один запрос на весь импорт)
+    owned = await CategoryDAO.find_owned_ids(session, current_user, {item.category_id for _, item in valid})
+    for result, item in valid:
+        if item.category_id not in owned:
+            result.errors.append("category_id: Категория не найдена или доступ запрещен")
+
+    if any(result.errors for result in results):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[result.model_dump() for result in results if result.errors]
+        )
+
+    # 3. Вставка одной транзакцией
+    ids = await TransactionDAO.create_many(session, [item for _, item in valid], current_user)
+    await mark_user_write(current_user.id)
+    await invalidate_user_analytics(current_user.id)
+    for result, new_id in zip(results, ids):
+        result.id = new_id
+    return {"inserted": len(ids), "results": results}
+
+@router.get("/graph", response_class=Response)
 async def get_expenses_graph(
     start_date: date,
     end_date: date,
+    chart_format: ChartFormat | None = Query(None, alias="format"),
+    accept: str | None = Header(None),
+    if_none_match: str | None = Header(None),
     current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
-    # 1. Получаем статистику (используем тот же метод DAO, что и раньше)
-    stats_data = await TransactionDAO.get_statistics(session, current_user, start_date, end_date)
+    # 1. Получаем сводку (тот же агрегат, что и для /stats и /summary)
+    summary = await TransactionDAO.get_summary(session, current_user, start_date, end_date)
     
     # 2. Подготавливаем данные для графика (только расходы)
     # Нам нужен словарь: {"Еда": 500.0, "Такси": 300.0}
     chart_data = {}
-    for item in stats_data:
-        # Мы хотим рисовать только расходы, доходы на круговой диаграмме обычно не нужны
-        # Но пока нарисуем всё, что вернет статистика
-        if item.total_amount > 0: # Исключаем отрицательные значения если вдруг
-             chart_data[item.name] = float(item.total_amount)
+    for item in summary["categories"]:
+        if item["total_expense"] > 0: # Исключаем категории без расходов
+            # Категории с одинаковым именем рисуем одним сектором
+            chart_data[item["name"]] = chart_data.get(item["name"], 0.0) + item["total_expense"]
     
     if not chart_data:
         raise HTTPException(status_code=404, detail="Нет данных за этот период")
 
-    # 3. Генерируем картинку
-    image_buf = generate_pie_chart(chart_data)
+    # 3. Картинка однозначно определяется данными: если у клиента она уже есть — 304
+    chart_format = negotiate_chart_format(chart_format, accept)
+    key = chart_key(chart_data, chart_format.value)
+    # Vary: ответ без ?format= зависит от Accept
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache", "Vary": "Accept"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # 4. SVG собирается строкой за микросекунды — рисуем сразу, без кеша и пула процессов
+    if chart_format == ChartFormat.svg:
+        return Response(content=render_pie_svg(chart_data), media_type="image/svg+xml", headers=headers)
+
+    # 5. PNG берем из кеша или генерируем в пуле процессов, не блокируя event loop
+    image = await chart_cache.get(key)
+    if image is None:
+        try:
+            image = await chart_renderer.render_pie(chart_data)
+        except ChartRendererBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, попробуйте позже",
+                headers={"Retry-After": "1"},
+            )
+        except ChartRenderTimeout:
+            raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Не удалось построить диаграмму вовремя")
+        except ChartRendererCrashed:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Не удалось построить диаграмму, попробуйте еще раз",
+                headers={"Retry-After": "1"},
+            )
+        await chart_cache.set(key, image)
     
-    # 4. Отдаем как файл
-    return StreamingResponse(image_buf, media_type="image/png")
+    # 6. Отдаем как файл
+    return Response(content=image, media_type="image/png", headers=headers)
 
 
-@router.get("/report", response_model=list[STransactionResponse])
+@router.get("/report", response_model=STransactionPage)
 async def get_transaction_report(
     start_date: date,
     end_date: date,
+    limit: int = Query(100, ge=1, le=REPORT_PAGE_LIMIT),
+    after: str | None = None,
     current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
-    transactions = await TransactionDAO.get_report(session, current_user, start_date, end_date)
-    return transactions
+    after_key = decode_cursor(after) if after else None
+    # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+    transactions = await TransactionDAO.get_report(
+        session, current_user, start_date, end_date, limit + 1, after_key
+    )
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        next_cursor = encode_cursor(last["transaction_date"], last["id"])
+    # Строки уже в форме STransactionResponse: отдаем через orjson без повторной валидации
+    return ORJSONResponse({"items": transactions, "next_cursor": next_cursor})
 
 @router.get("/stats", response_model=SStatsResponse)
 async def get_transaction_stats(
     start_date: date,
     end_date: date,
     current_user: User = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
+):
+    stats = await TransactionDAO.get_summary(session, current_user, start_date, end_date)
+    return stats
+
+@router.get("/summary", response_model=SSummaryResponse)
+async def get_transaction_summary(
+    start_date: date,
+    end_date: date,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    summary = await TransactionDAO.get_summary(session, current_user, start_date, end_date)
+    return summary
+
+@router.get("/timeseries", response_model=STimeseriesResponse)
+async def get_transaction_timeseries(
+    start_date: date,
+    end_date: date,
+    granularity: Granularity = Granularity.day,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    stats = await TransactionDAO.get_stats(session, current_user, start_date, end_date)
-    return stats
\ No newline at end of file
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="end_date раньше start_date")
+    if (end_date - start_date).days // GRANULARITY_DAYS[granularity] > TIMESERIES_MAX_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Слишком много периодов (максимум {TIMESERIES_MAX_POINTS}), укрупните granularity"
+        )
+    timeseries = await TransactionDAO.get_timeseries(session, current_user, start_date, end_date, granularity)
+    return timeseries
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+
+class SAnomaly(BaseModel):
+    month: str
+    amount: float
+    z_score: float
+
+class SCategoryAnalytics(BaseModel):
+    category_id: int
+    name: str
+    # Значения по месяцам из SCategoryAnalyticsResponse.months; None — недостаточно истории
+    monthly: list[float | None]
+    rolling_3: list[float | None]
+    rolling_12: list[float | None]
+    mom_change: list[float | None]
+    mom_change_pct: list[float | None]
+    anomalies: list[SAnomaly]
+
+class SCategoryAnalyticsResponse(BaseModel):
+    months: list[str]
+    categories: list[SCategoryAnalytics]
@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+from enum import Enum
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    xlsx = "xlsx"
+    pdf = "pdf"
+
+class ExportStatus(str, Enum):
+    queued = "queued"    # Ждет воркера (в том числе перед повтором)
+    running = "running"
+    done = "done"
+    failed = "failed"    # Исчерпаны попытки
+
+class SExportCreate(BaseModel):
+    format: ExportFormat
+    start_date: date
+    end_date: date
+
+class SExportResponse(BaseModel):
+    id: str
+    format: ExportFormat
+    start_date: date
+    end_date: date
+    status: ExportStatus
+    attempts: int
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
+    # Заполняется, когда файл готов
+    download_url: str | None = None
@@ -1,7 +1,14 @@
-from pydantic import BaseModel, ConfigDict
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from datetime import datetime, date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 from enum import Enum
 
+
+def from_minor(value: int) -> float:
+    """Копейки -> рубли для JSON. Одно деление на 100 дает ближайший к точной сумме float."""
+    return value / 100
+
+
 # (Enum)
 class TransactionType(str, Enum):
     expense = "expense"  # Расход
@@ -9,15 +16,33 @@ class TransactionType(str, Enum):
 
 # Схема для создания
 class STransactionCreate(BaseModel):
-    amount: float
+    # Decimal, а не float: 0.1 + 0.2 должно давать ровно 30 копеек
+    amount: Decimal = Field(max_digits=12, decimal_places=2)
     description: str | None = None
     category_id: int
     transaction_date: datetime
     type: TransactionType 
 
+    @field_validator("amount", mode="before")
+    @classmethod
+    def round_to_kopecks(cls, value):
+        # Клиенты (и бот) присылают и 10.005: округляем до копеек, а не отвечаем 422
+        if isinstance(value, (int, float, str, Decimal)):
+            try:
+                return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            except InvalidOperation:
+                pass
+        # Не число — пусть ошибку сформулирует сама схема
+        return value
+
+    @property
+    def amount_minor(self) -> int:
+        return int(self.amount * 100)
+
 class STransactionResponse(BaseModel):
     id: int
     amount: float
+    amount_minor: int
     description: str | None
     transaction_date: datetime
     created_at: datetime
@@ -25,7 +50,58 @@ class STransactionResponse(BaseModel):
     type: TransactionType 
     model_config = ConfigDict(from_attributes=True)
 
+class SBulkRowResult(BaseModel):
+    row: int
+    id: int | None = None
+    errors: list[str] = []
+
+class SBulkResponse(BaseModel):
+    inserted: int
+    results: list[SBulkRowResult]
+
+class STransactionPage(BaseModel):
+    items: list[STransactionResponse]
+    next_cursor: str | None = None
+
 class SStatsResponse(BaseModel):
     total_income: float
     total_expense: float
-    balance: float
\ No newline at end of file
+    balance: float
+    # Те же суммы точно, в копейках
+    total_income_minor: int
+    total_expense_minor: int
+    balance_minor: int
+
+class SCategorySummary(BaseModel):
+    category_id: int
+    name: str
+    total_income: float
+    total_expense: float
+    total_income_minor: int
+    total_expense_minor: int
+    count: int
+
+class SSummaryResponse(SStatsResponse):
+    count: int
+    categories: list[SCategorySummary]
+
+class ChartFormat(str, Enum):
+    png = "png"
+    svg = "svg"
+
+class Granularity(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+class STimeseriesPoint(BaseModel):
+    bucket: date
+    total_income: float
+    total_expense: float
+    net: float
+    balance: float
+
+class STimeseriesResponse(BaseModel):
+    granularity: Granularity
+    opening_balance: float
+    points: list[STimeseriesPoint]
\ No newline at end of file
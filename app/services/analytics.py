@@ -0,0 +1,164 @@
+import json
+import logging
+from datetime import date
+
+import numpy as np
+from redis.exceptions import RedisError
+
+from app.services.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Сколько месяцев истории нужно до первого показанного месяца (окно 12 мес.)
+HISTORY_MONTHS = 12
+ANALYTICS_CACHE_TTL = 24 * 3600
+MIN_STD = 1.0
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _nullable(values: np.ndarray) -> list:
+    """NaN -> None для JSON, остальное округляем до копеек."""
+    return np.where(np.isnan(values), None, values.round(2)).tolist()
+
+
+def _window_sums(cumsum: np.ndarray, k: int) -> np.ndarray:
+    """Суммы по окнам из k месяцев, заканчивающимся в каждом месяце (до k-1 — NaN)."""
+    n_months = cumsum.shape[1] - 1
+    sums = np.full((cumsum.shape[0], n_months), np.nan)
+    if n_months >= k:
+        sums[:, k - 1:] = cumsum[:, k:] - cumsum[:, :-k]
+    return sums
+
+
+def compute_category_analytics(
+    categories: list[tuple[int, str]],
+    category_index: np.ndarray,
+    month_index: np.ndarray,
+    amounts: np.ndarray,
+    first_month: date,
+    n_months: int,
+    shown_months: int,
+    z_threshold: float,
+) -> dict:
+    """
+    Все метрики по матрице «категория × месяц» без циклов по данным:
+    скользящие средние через накопленные суммы, MoM через diff,
+    z-score относительно предыдущих 12 месяцев той же категории.
+    """
+    spend = np.zeros((len(categories), n_months))
+    spend[category_index, month_index] = amounts
+
+    zeros = np.zeros((len(categories), 1))
+    cumsum = np.concatenate([zeros, np.cumsum(spend, axis=1)], axis=1)
+    cumsum_sq = np.concatenate([zeros, np.cumsum(spend ** 2, axis=1)], axis=1)
+
+    rolling_3 = _window_sums(cumsum, 3) / 3
+    rolling_12 = _window_sums(cumsum, 12) / 12
+
+    mom_change = np.full_like(spend, np.nan)
+    mom_change[:, 1:] = np.diff(spend, axis=1)
+    mom_change_pct = np.full_like(spend, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mom_change_pct[:, 1:] = np.where(spend[:, :-1] > 0, mom_change[:, 1:] / spend[:, :-1] * 100, np.nan)
+
+    # Статистика предыдущих 12 месяцев (без текущего): окно, закончившееся месяцем раньше
+    prev_mean = np.full_like(spend, np.nan)
+    prev_sq_mean = np.full_like(spend, np.nan)
+    prev_mean[:, 1:] = (_window_sums(cumsum, HISTORY_MONTHS) / HISTORY_MONTHS)[:, :-1]
+    prev_sq_mean[:, 1:] = (_window_sums(cumsum_sq, HISTORY_MONTHS) / HISTORY_MONTHS)[:, :-1]
+    # Нижняя граница std в 1 ₽: при ровной истории всплеск иначе дал бы деление на ноль
+    prev_std = np.maximum(np.sqrt(np.maximum(prev_sq_mean - prev_mean ** 2, 0)), MIN_STD)
+    z_scores = (spend - prev_mean) / prev_std
+    anomalies = np.abs(np.nan_to_num(z_scores)) >= z_threshold
+
+    shown = slice(n_months - shown_months, n_months)
+    months = [add_months(first_month, i).strftime("%Y-%m") for i in range(n_months)][shown]
+    anomaly_rows, anomaly_cols = np.nonzero(anomalies[:, shown])
+    shown_spend, shown_z = spend[:, shown], z_scores[:, shown]
+
+    result = {"months": months, "categories": []}
+    for row, (category_id, name) in enumerate(categories):
+        result["categories"].append({
+            "category_id": category_id,
+            "name": name,
+            "monthly": _nullable(shown_spend[row]),
+            "rolling_3": _nullable(rolling_3[row, shown]),
+            "rolling_12": _nullable(rolling_12[row, shown]),
+            "mom_change": _nullable(mom_change[row, shown]),
+            "mom_change_pct": _nullable(mom_change_pct[row, shown]),
+            "anomalies": [],
+        })
+    for row, col in zip(anomaly_rows.tolist(), anomaly_cols.tolist()):
+        result["categories"][row]["anomalies"].append({
+            "month": months[col],
+            "amount": round(float(shown_spend[row, col]), 2),
+            "z_score": round(float(shown_z[row, col]), 2),
+        })
+    return result
+
+
+def build_category_analytics(rows: list, first_month: date, n_months: int, shown_months: int, z_threshold: float) -> dict:
+    """
+    rows — колонки (category_id, name, month, amount) из TransactionDAO.get_monthly_expenses.
+    Переводит их в массивы и считает метрики; вызывается в потоке, не в event loop.
+    """
+    first_ordinal = first_month.year * 12 + first_month.month
+    # Месяцы вне окна (например, транзакции будущими датами) отбрасываем до scatter
+    rows = [row for row in rows if 0 <= row[2].year * 12 + row[2].month - first_ordinal < n_months]
+    if not rows:
+        months = [add_months(first_month, i).strftime("%Y-%m") for i in range(n_months)]
+        return {"months": months[n_months - shown_months:], "categories": []}
+
+    category_ids, names, month_starts, amounts = zip(*rows)
+    unique_ids, category_index = np.unique(np.array(category_ids), return_inverse=True)
+    name_by_id = dict(zip(category_ids, names))
+    categories = [(int(category_id), name_by_id[category_id]) for category_id in unique_ids.tolist()]
+
+    month_ordinals = np.array([month.year * 12 + month.month for month in month_starts])
+    month_index = month_ordinals - first_ordinal
+
+    return compute_category_analytics(
+        categories,
+        category_index,
+        month_index,
+        np.array(amounts, dtype=float),
+        first_month,
+        n_months,
+        shown_months,
+        z_threshold,
+    )
+
+
+# --- Кеш результата до следующей транзакции пользователя ---
+# Hash на пользователя: поле — параметры запроса; запись транзакции или переименование категории удаляет весь hash
+
+async def get_cached(user_id: int, field: str) -> dict | None:
+    try:
+        raw = await redis_client.hget(f"analytics:{user_id}", field)
+    except RedisError as e:
+        logger.warning("Кеш аналитики в Redis недоступен: %s", e)
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+async def set_cached(user_id: int, field: str, value: dict):
+    key = f"analytics:{user_id}"
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, field, json.dumps(value, ensure_ascii=False))
+            pipe.expire(key, ANALYTICS_CACHE_TTL)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("Кеш аналитики в Redis недоступен: %s", e)
+
+
+async def invalidate_user_analytics(user_id: int):
+    """Вызывать после записи транзакций и изменения категорий пользователя."""
+    try:
+        await redis_client.delete(f"analytics:{user_id}")
+    except RedisError as e:
+        logger.warning("Кеш аналитики в Redis недоступен: %s", e)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Меняем при изменении внешнего вида диаграммы, чтобы старые картинки не отдавались
+CHART_VERSION = "pie-v1"
+
+
+def chart_key(data: dict, fmt: str = "png") -> str:
+    """Хеш нормализованных данных и формата диаграммы: одинаковые данные — одинаковая картинка."""
+    normalized = sorted((str(name), round(float(value), 2)) for name, value in data.items())
+    payload = json.dumps([CHART_VERSION, fmt, normalized], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    Двухуровневый кеш PNG: LRU в памяти процесса и Redis, общий для всех воркеров.
+    Ошибки Redis не ломают запрос — просто считаем это промахом.
+    """
+
+    def __init__(self, redis: aioredis.Redis, ttl: int, lru_max_bytes: int, max_item_bytes: int):
+        self.ttl = ttl
+        self.lru_max_bytes = lru_max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._lru: OrderedDict[str, bytes] = OrderedDict()
+        self._lru_bytes = 0
+        self._redis = redis
+
+    def _lru_get(self, key: str) -> bytes | None:
+        image = self._lru.get(key)
+        if image is not None:
+            self._lru.move_to_end(key)
+        return image
+
+    def _lru_put(self, key: str, image: bytes):
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return
+        self._lru[key] = image
+        self._lru_bytes += len(image)
+        while self._lru_bytes > self.lru_max_bytes:
+            _, evicted = self._lru.popitem(last=False)
+            self._lru_bytes -= len(evicted)
+
+    async def get(self, key: str) -> bytes | None:
+        image = self._lru_get(key)
+        if image is not None:
+            return image
+        try:
+            image = await self._redis.get(f"chart:{key}")
+        except RedisError as e:
+            logger.warning("Кеш диаграмм в Redis недоступен: %s", e)
+            return None
+        if image is not None:
+            self._lru_put(key, image)
+        return image
+
+    async def set(self, key: str, image: bytes):
+        # Слишком большие картинки не кешируем вовсе
+        if len(image) > self.max_item_bytes:
+            return
+        self._lru_put(key, image)
+        try:
+            await self._redis.set(f"chart:{key}", image, ex=self.ttl)
+        except RedisError as e:
+            logger.warning("Кеш диаграмм в Redis недоступен: %s", e)
+
+
+chart_cache = ChartCache(
+    redis=redis_client,
+    ttl=settings.CHART_CACHE_TTL,
+    lru_max_bytes=settings.CHART_CACHE_LRU_BYTES,
+    max_item_bytes=settings.CHART_CACHE_MAX_ITEM_BYTES,
+)
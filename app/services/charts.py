@@ -1,10 +1,14 @@
-import matplotlib
-# ВАЖНО: Эту строчку нужно писать ДО импорта pyplot
-# Она говорит: "Рисуй без экрана"
-matplotlib.use('Agg') 
-
-import matplotlib.pyplot as plt
+import asyncio
 import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config import settings
+from app.services.metrics import CHART_RENDER_LATENCY
+
+logger = logging.getLogger(__name__)
 
 def generate_pie_chart(data: dict) -> io.BytesIO:
     """
@@ -15,6 +19,14 @@ def generate_pie_chart(data: dict) -> io.BytesIO:
     if not data:
         return None
 
+    # matplotlib грузим только здесь: API-процесс его не импортирует,
+    # он нужен лишь воркерам пула, которые рисуют PNG
+    import matplotlib
+    # ВАЖНО: Эту строчку нужно писать ДО импорта pyplot
+    # Она говорит: "Рисуй без экрана"
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
     labels = list(data.keys())
     values = list(data.values())
     
@@ -35,4 +47,116 @@ def generate_pie_chart(data: dict) -> io.BytesIO:
     # Очищаем память (обязательно!)
     plt.close(fig)
     
-    return buf
\ No newline at end of file
+    return buf
+
+
+def render_pie_png(data: dict) -> bytes:
+    """То же, что generate_pie_chart, но возвращает bytes (их можно вернуть из процесса)."""
+    return generate_pie_chart(data).getvalue()
+
+
+def _warm_up_worker():
+    """
+    Инициализатор процесса рендера: грузим шрифты и Agg заранее,
+    чтобы первый запрос пользователя не платил за холодный старт.
+    """
+    from matplotlib import font_manager
+    font_manager.fontManager.findfont("DejaVu Sans")
+    render_pie_png({"warm-up": 1})
+
+
+class ChartRendererBusy(Exception):
+    """Очередь рендера заполнена."""
+
+
+class ChartRenderTimeout(Exception):
+    """Рендер не уложился в таймаут."""
+
+
+class ChartRendererCrashed(Exception):
+    """Воркер пула умер во время рендера; пул уже пересоздан."""
+
+
+class ChartRenderer:
+    """
+    Рендер диаграмм в пуле процессов: matplotlib не блокирует event loop,
+    а глобальное состояние pyplot у каждого воркера свое.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        # Слот занят, пока задача реально выполняется или ждет в пуле
+        self._slots = asyncio.Semaphore(workers + queue_size)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self):
+        if self._executor is None:
+            # spawn, а не fork: форк процесса с запущенным event loop и потоками небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+            )
+            # Поднимаем воркеры сразу, а не на первом запросе
+            for _ in range(self.workers):
+                self._executor.submit(int)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """
+        Пул с упавшим воркером (OOM, kill) больше не принимает задачи — заменяем его новым.
+        Если пул уже заменил параллельный запрос, ничего не делаем.
+        """
+        if self._executor is broken:
+            logger.warning("Пул рендера диаграмм сломан, пересоздаем")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.start()
+
+    def _submit(self, data: dict):
+        executor = self._executor
+        try:
+            return executor, executor.submit(render_pie_png, data)
+        except BrokenProcessPool:
+            # Пул сломался на одной из прошлых задач: эта задача не виновата, пробуем в новом
+            self._restart(executor)
+            return self._executor, self._executor.submit(render_pie_png, data)
+
+    async def render_pie(self, data: dict) -> bytes:
+        if self._executor is None:
+            self.start()
+        if self._slots.locked():
+            raise ChartRendererBusy()
+
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            executor, future = self._submit(data)
+        except BrokenProcessPool:
+            # Задача не попала в пул — колбэк не освободит слот
+            self._slots.release()
+            raise ChartRendererCrashed()
+        # Слот освобождается по завершении задачи, даже если клиент уже получил таймаут
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._slots.release))
+        try:
+            # Замер в API-процессе: метрики из воркеров пула сюда не попадают
+            with CHART_RENDER_LATENCY.time():
+                return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise ChartRenderTimeout()
+        except BrokenProcessPool:
+            # Воркер умер на этой задаче: слот уже освобожден колбэком, пул нужен новый
+            self._restart(executor)
+            raise ChartRendererCrashed()
+
+chart_renderer = ChartRenderer(
+    workers=settings.CHART_WORKERS,
+    queue_size=settings.CHART_QUEUE_SIZE,
+    timeout=settings.CHART_RENDER_TIMEOUT,
+)
@@ -0,0 +1,128 @@
+"""
+Сборка файлов выгрузки. Функции синхронные и работают только с готовыми данными:
+воркер вызывает их через asyncio.to_thread. openpyxl и matplotlib импортируются
+внутри функций, чтобы API, который только ставит задачи, их не грузил.
+"""
+import csv
+import io
+from datetime import date
+
+from app.schemas.export import ExportFormat
+
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.xlsx: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ExportFormat.pdf: "application/pdf",
+}
+
+# Те же колонки, что принимает POST /transactions/bulk (плюс id и имя категории)
+COLUMNS = ["id", "transaction_date", "type", "amount", "category_id", "category", "description"]
+PDF_ROWS_PER_PAGE = 40
+
+
+def export_filename(fmt: ExportFormat, start_date: date, end_date: date) -> str:
+    return f"transactions_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{fmt.value}"
+
+
+def _table_rows(rows: list[dict], categories: dict[int, str]):
+    for row in rows:
+        yield [
+            row["id"],
+            row["transaction_date"],
+            row["type"],
+            row["amount"],
+            row["category_id"],
+            categories.get(row["category_id"], ""),
+            row["description"] or "",
+        ]
+
+
+def build_csv(rows: list[dict], categories: dict[int, str], summary: dict, start_date: date, end_date: date) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for values in _table_rows(rows, categories):
+        values[1] = values[1].isoformat()
+        writer.writerow(values)
+    # BOM — чтобы Excel сам понял UTF-8
+    return buf.getvalue().encode("utf-8-sig")
+
+
+def build_xlsx(rows: list[dict], categories: dict[int, str], summary: dict, start_date: date, end_date: date) -> bytes:
+    from openpyxl import Workbook
+
+    # write_only пишет строки потоком и не держит в памяти объекты ячеек
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Транзакции")
+    ws.append(COLUMNS)
+    for values in _table_rows(rows, categories):
+        ws.append(values)
+
+    ws = wb.create_sheet("Итоги")
+    ws.append(["Период", f"{start_date} — {end_date}"])
+    ws.append(["Доходы", summary["total_income"]])
+    ws.append(["Расходы", summary["total_expense"]])
+    ws.append(["Баланс", summary["balance"]])
+    ws.append([])
+    ws.append(["category_id", "category", "total_income", "total_expense", "count"])
+    for item in summary["categories"]:
+        ws.append([item["category_id"], item["name"], item["total_income"], item["total_expense"], item["count"]])
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def build_pdf(rows: list[dict], categories: dict[int, str], summary: dict, start_date: date, end_date: date) -> bytes:
+    # Figure без pyplot: нет глобального состояния, можно рисовать из потока
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    buf = io.BytesIO()
+    with PdfPages(buf) as pdf:
+        # Страница 1: итоги и диаграмма расходов (как /transactions/graph)
+        fig = Figure(figsize=(8.27, 11.69))  # A4
+        fig.suptitle(f"Отчет за {start_date:%d.%m.%Y} — {end_date:%d.%m.%Y}")
+        fig.text(
+            0.1, 0.88,
+            f"Доходы: {summary['total_income']:.2f}\n"
+            f"Расходы: {summary['total_expense']:.2f}\n"
+            f"Баланс: {summary['balance']:.2f}\n"
+            f"Операций: {summary['count']}",
+            va="top",
+        )
+        expenses = {}
+        for item in summary["categories"]:
+            if item["total_expense"] > 0:
+                expenses[item["name"]] = expenses.get(item["name"], 0.0) + item["total_expense"]
+        if expenses:
+            ax = fig.add_axes((0.1, 0.1, 0.8, 0.6))
+            ax.pie(list(expenses.values()), labels=list(expenses.keys()), autopct="%1.1f%%", startangle=140)
+            ax.set_title("Расходы по категориям")
+        pdf.savefig(fig)
+
+        # Дальше — таблица операций постранично
+        table = [
+            [values[1].strftime("%d.%m.%Y"), values[2], f"{values[3]:.2f}", values[5], values[6][:40]]
+            for values in _table_rows(rows, categories)
+        ]
+        for offset in range(0, len(table), PDF_ROWS_PER_PAGE):
+            fig = Figure(figsize=(8.27, 11.69))
+            ax = fig.add_axes((0.05, 0.05, 0.9, 0.9))
+            ax.axis("off")
+            page = ax.table(
+                cellText=table[offset:offset + PDF_ROWS_PER_PAGE],
+                colLabels=["Дата", "Тип", "Сумма", "Категория", "Описание"],
+                loc="upper center",
+            )
+            page.auto_set_font_size(False)
+            page.set_fontsize(8)
+            pdf.savefig(fig)
+    return buf.getvalue()
+
+
+BUILDERS = {
+    ExportFormat.csv: build_csv,
+    ExportFormat.xlsx: build_xlsx,
+    ExportFormat.pdf: build_pdf,
+}
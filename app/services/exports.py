@@ -0,0 +1,204 @@
+"""
+Очередь фоновых выгрузок на Redis.
+
+API кладет задачу (enqueue_export), воркер (python -m app.worker) забирает ее
+через BLMOVE в список processing, строит файл и кладет результат в Redis с TTL.
+Неудачные попытки уходят в отложенную очередь (sorted set по времени повтора).
+"""
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+from app.config import settings
+from app.schemas.export import ExportFormat, ExportStatus
+from app.services.redis_client import redis_client
+
+QUEUE_KEY = "exports:queue"
+PROCESSING_KEY = "exports:processing"
+DELAYED_KEY = "exports:delayed"
+# Пока задача не завершена, ключи живут дольше любой разумной очереди
+PENDING_TTL = 24 * 3600
+
+
+class ExportQueueFull(Exception):
+    """В очереди слишком много задач."""
+
+
+class ExportLimitExceeded(Exception):
+    """У пользователя слишком много незавершенных выгрузок."""
+
+
+def _job_key(job_id: str) -> str:
+    return f"export:{job_id}"
+
+
+def _result_key(job_id: str) -> str:
+    return f"export:{job_id}:result"
+
+
+def _user_key(user_id: int) -> str:
+    return f"exports:user:{user_id}"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _decode(raw: dict) -> dict:
+    job = {k.decode(): v.decode() for k, v in raw.items()}
+    job["user_id"] = int(job["user_id"])
+    job["attempts"] = int(job["attempts"])
+    return job
+
+
+async def enqueue_export(user_id: int, fmt: ExportFormat, start_date: date, end_date: date) -> dict:
+    if await redis_client.llen(QUEUE_KEY) >= settings.EXPORT_QUEUE_MAX:
+        raise ExportQueueFull()
+
+    job_id = uuid.uuid4().hex
+    user_key = _user_key(user_id)
+    # Сначала занимаем слот, потом проверяем лимит: так две параллельные заявки не проскочат обе
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.sadd(user_key, job_id)
+        pipe.expire(user_key, PENDING_TTL)
+        pipe.scard(user_key)
+        _, _, active = await pipe.execute()
+    if active > settings.EXPORT_MAX_ACTIVE_PER_USER:
+        await redis_client.srem(user_key, job_id)
+        raise ExportLimitExceeded()
+
+    job = {
+        "id": job_id,
+        "user_id": user_id,
+        "format": fmt.value,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "status": ExportStatus.queued.value,
+        "attempts": 0,
+        "created_at": _now(),
+    }
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(job_id), mapping=job)
+        pipe.expire(_job_key(job_id), PENDING_TTL)
+        pipe.lpush(QUEUE_KEY, job_id)
+        await pipe.execute()
+    return job
+
+
+async def get_job(job_id: str) -> dict | None:
+    raw = await redis_client.hgetall(_job_key(job_id))
+    return _decode(raw) if raw else None
+
+
+async def get_result(job_id: str) -> bytes | None:
+    return await redis_client.get(_result_key(job_id))
+
+
+# --- Дальше — функции воркера ---
+
+async def claim(timeout: float) -> dict | None:
+    """Ждет задачу до timeout секунд и помечает ее как выполняемую."""
+    job_id = await redis_client.blmove(QUEUE_KEY, PROCESSING_KEY, timeout, "RIGHT", "LEFT")
+    if job_id is None:
+        return None
+    job_id = job_id.decode()
+    key = _job_key(job_id)
+    if not await redis_client.exists(key):
+        # Задача истекла, пока лежала в очереди
+        await redis_client.lrem(PROCESSING_KEY, 0, job_id)
+        return None
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={"status": ExportStatus.running.value, "started_at": time.time()})
+        pipe.hincrby(key, "attempts", 1)
+        await pipe.execute()
+    return await get_job(job_id)
+
+
+async def complete(job: dict, content: bytes, filename: str, media_type: str):
+    job_id = job["id"]
+    ttl = settings.EXPORT_RESULT_TTL
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(_result_key(job_id), content, ex=ttl)
+        pipe.hset(_job_key(job_id), mapping={
+            "status": ExportStatus.done.value,
+            "finished_at": _now(),
+            "filename": filename,
+            "media_type": media_type,
+            "size": len(content),
+        })
+        pipe.hdel(_job_key(job_id), "error")
+        # Статус живет столько же, сколько файл
+        pipe.expire(_job_key(job_id), ttl)
+        pipe.srem(_user_key(job["user_id"]), job_id)
+        pipe.lrem(PROCESSING_KEY, 0, job_id)
+        await pipe.execute()
+
+
+async def fail(job: dict, error: str) -> bool:
+    """Записывает ошибку и планирует повтор. Возвращает True, если попытки еще остались."""
+    job_id = job["id"]
+    retry = job["attempts"] < settings.EXPORT_MAX_ATTEMPTS
+    async with redis_client.pipeline(transaction=True) as pipe:
+        if retry:
+            # Экспоненциальная пауза: 5, 10, 20... секунд
+            delay = settings.EXPORT_RETRY_BACKOFF * 2 ** (job["attempts"] - 1)
+            pipe.hset(_job_key(job_id), mapping={"status": ExportStatus.queued.value, "error": error})
+            # Время прошлой попытки не должно сделать следующую «зависшей» сразу после BLMOVE
+            pipe.hdel(_job_key(job_id), "started_at")
+            pipe.zadd(DELAYED_KEY, {job_id: time.time() + delay})
+        else:
+            pipe.hset(_job_key(job_id), mapping={
+                "status": ExportStatus.failed.value,
+                "error": error,
+                "finished_at": _now(),
+            })
+            pipe.expire(_job_key(job_id), settings.EXPORT_RESULT_TTL)
+            pipe.srem(_user_key(job["user_id"]), job_id)
+        pipe.lrem(PROCESSING_KEY, 0, job_id)
+        await pipe.execute()
+    return retry
+
+
+async def promote_delayed() -> int:
+    """Возвращает в очередь задачи, у которых подошло время повтора."""
+    due = await redis_client.zrangebyscore(DELAYED_KEY, 0, time.time())
+    promoted = 0
+    for job_id in due:
+        # ZREM атомарен: задачу переносит только один из воркеров
+        if await redis_client.zrem(DELAYED_KEY, job_id):
+            await redis_client.lpush(QUEUE_KEY, job_id)
+            promoted += 1
+    return promoted
+
+
+async def requeue_stale() -> int:
+    """
+    Подбирает задачи упавших воркеров: живой воркер обрывает задачу по EXPORT_JOB_TIMEOUT,
+    так что running дольше двух таймаутов — это потерянная задача.
+    BLMOVE и запись started_at в claim() не атомарны: если воркер упал между ними,
+    started_at не появится никогда. Такой задаче время ставит сам подборщик (HSETNX —
+    claim() живого воркера его перезапишет), и через два таймаута она тоже считается потерянной.
+    """
+    deadline = time.time() - 2 * settings.EXPORT_JOB_TIMEOUT
+    requeued = 0
+    for job_id in await redis_client.lrange(PROCESSING_KEY, 0, -1):
+        job_id = job_id.decode()
+        job = await get_job(job_id)
+        if job is None:
+            # Статус истек — возвращать нечего
+            await redis_client.lrem(PROCESSING_KEY, 0, job_id)
+            continue
+        if "started_at" not in job:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hsetnx(_job_key(job_id), "started_at", time.time())
+                # Если статус истек прямо сейчас, HSETNX создал бы ключ без TTL
+                pipe.expire(_job_key(job_id), PENDING_TTL, nx=True)
+                await pipe.execute()
+            continue
+        if float(job["started_at"]) > deadline:
+            continue
+        if not await redis_client.lrem(PROCESSING_KEY, 1, job_id):
+            continue  # Уже подобрал другой воркер
+        if await fail(job, "Воркер остановился во время выгрузки"):
+            requeued += 1
+    return requeued
@@ -0,0 +1,117 @@
+import functools
+import inspect
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.database import engine
+
+# uvicorn --workers N: у каждого процесса свои счетчики, и /metrics отдал бы случайный воркер.
+# С PROMETHEUS_MULTIPROC_DIR prometheus_client пишет значения в файлы, а /metrics их суммирует
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ["method", "route"]
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Количество HTTP-запросов", ["method", "route", "status"]
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запроса", ["dao_method"]
+)
+BCRYPT_LATENCY = Histogram(
+    "bcrypt_duration_seconds", "Время хеширования и проверки пароля", ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5),
+)
+CHART_RENDER_LATENCY = Histogram(
+    "chart_render_duration_seconds", "Время рендера диаграммы, включая ожидание в очереди пула",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+# Пул у каждого процесса свой, а set_function в файлы не пишет: в многопроцессном режиме
+# эти gauge не суммируются (состояние пула конкретного воркера — в /internal/pool)
+if not MULTIPROCESS:
+    _pool = engine.sync_engine.pool
+    Gauge("db_pool_checked_out", "Выданные соединения пула").set_function(lambda: _pool.checkedout())
+    Gauge("db_pool_idle", "Свободные соединения пула").set_function(lambda: _pool.checkedin())
+    Gauge("db_pool_waiting", "Ожидающие соединения").set_function(lambda: _pool.stats.waiting)
+
+
+def render_metrics() -> bytes:
+    """Метрики в текстовом формате Prometheus: этого процесса или всех воркеров сразу."""
+    if not MULTIPROCESS:
+        return generate_latest()
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+# --- SQL: время запроса с меткой метода DAO, из которого он выполнен ---
+current_dao_method: ContextVar[str] = ContextVar("current_dao_method", default="other")
+
+
+def track_dao(cls):
+    """Декоратор класса DAO: выставляет метку метода для метрик SQL."""
+    for name, attr in list(vars(cls).items()):
+        if isinstance(attr, classmethod) and inspect.iscoroutinefunction(attr.__func__):
+            setattr(cls, name, classmethod(_with_dao_label(attr.__func__, f"{cls.__name__}.{name}")))
+    return cls
+
+
+def _with_dao_label(func, label: str):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_dao_method.set(label)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_dao_method.reset(token)
+    return wrapper
+
+
+# Слушаем класс Engine, а не конкретный engine: так учитываются и реплики.
+# Время старта храним в контексте выполнения, а не в conn.info: если запрос упал,
+# after_cursor_execute не вызывается, и стек в соединении копил бы устаревшие записи
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    DB_QUERY_LATENCY.labels(current_dao_method.get()).observe(elapsed)
+
+
+# --- HTTP: чистый ASGI-middleware, без накладных расходов BaseHTTPMiddleware ---
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Шаблон пути (/categories/{category_id}), а не сам путь — иначе метки разрастутся
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], path).observe(time.perf_counter() - start)
+            REQUEST_COUNT.labels(scope["method"], path, str(status_code)).inc()
@@ -0,0 +1,80 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """
+    Кеш аутентифицированных пользователей по subject токена (email).
+    Первый уровень — TTL+LRU в памяти процесса, второй (опционально) — Redis,
+    общий для всех воркеров. Хранится только то, что нужно эндпоинтам, без хеша пароля.
+    """
+
+    def __init__(self, ttl: int, max_items: int, redis: aioredis.Redis | None = None):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._redis = redis
+        self._items: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    async def get(self, subject: str) -> dict | None:
+        item = self._items.get(subject)
+        if item is not None:
+            expires_at, principal = item
+            if expires_at > time.monotonic():
+                self._items.move_to_end(subject)
+                return principal
+            del self._items[subject]
+
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(f"principal:{subject}")
+        except RedisError as e:
+            logger.warning("Кеш пользователей в Redis недоступен: %s", e)
+            return None
+        if raw is None:
+            return None
+        principal = json.loads(raw)
+        self._put_local(subject, principal)
+        return principal
+
+    def _put_local(self, subject: str, principal: dict):
+        self._items[subject] = (time.monotonic() + self.ttl, principal)
+        self._items.move_to_end(subject)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    async def set(self, subject: str, principal: dict):
+        self._put_local(subject, principal)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(f"principal:{subject}", json.dumps(principal), ex=self.ttl)
+        except RedisError as e:
+            logger.warning("Кеш пользователей в Redis недоступен: %s", e)
+
+    async def invalidate(self, subject: str):
+        """Вызывать после любого изменения или удаления пользователя."""
+        self._items.pop(subject, None)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.delete(f"principal:{subject}")
+        except RedisError as e:
+            logger.warning("Кеш пользователей в Redis недоступен: %s", e)
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    max_items=settings.PRINCIPAL_CACHE_SIZE,
+    redis=redis_client if settings.PRINCIPAL_CACHE_REDIS else None,
+)
@@ -0,0 +1,6 @@
+from redis import asyncio as aioredis
+
+from app.config import settings
+
+# Один клиент (и один пул соединений) на процесс для всех кешей API
+redis_client = aioredis.from_url(settings.REDIS_URL)
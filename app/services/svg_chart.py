@@ -0,0 +1,68 @@
+"""
+Круговая диаграмма в SVG без зависимостей: строка собирается вручную за микросекунды,
+поэтому рисуется прямо в event loop, без пула процессов и без matplotlib.
+Геометрия и цвета повторяют PNG из charts.generate_pie_chart.
+"""
+import math
+from xml.sax.saxutils import escape
+
+# Палитра tab10 — цвета matplotlib по умолчанию
+COLORS = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+]
+SIZE = 600
+RADIUS = 200
+START_ANGLE = 140  # Как startangle=140 у ax.pie
+
+
+def _point(angle: float, radius: float) -> tuple[float, float]:
+    """Угол в градусах против часовой от оси X -> координаты SVG (ось Y вниз)."""
+    rad = math.radians(angle)
+    return SIZE / 2 + radius * math.cos(rad), SIZE / 2 - radius * math.sin(rad)
+
+
+def render_pie_svg(data: dict) -> bytes:
+    """Принимает словарь вида {'Еда': 500, 'Такси': 200}, возвращает SVG в байтах."""
+    total = sum(data.values())
+    center = SIZE / 2
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SIZE}" height="{SIZE}" '
+        f'viewBox="0 0 {SIZE} {SIZE}" font-family="DejaVu Sans, sans-serif" font-size="14">',
+        f'<rect width="{SIZE}" height="{SIZE}" fill="#ffffff"/>',
+        f'<text x="{center}" y="40" text-anchor="middle" font-size="18">Расходы по категориям</text>',
+    ]
+
+    angle = START_ANGLE
+    for i, (name, value) in enumerate(data.items()):
+        span = 360 * value / total
+        color = COLORS[i % len(COLORS)]
+        if span >= 360:
+            # Дуга с совпадающими концами не рисуется — целый круг отдельно
+            parts.append(f'<circle cx="{center}" cy="{center}" r="{RADIUS}" fill="{color}"/>')
+        else:
+            x1, y1 = _point(angle, RADIUS)
+            x2, y2 = _point(angle + span, RADIUS)
+            large_arc = 1 if span > 180 else 0
+            parts.append(
+                f'<path d="M{center},{center} L{x1:.2f},{y1:.2f} '
+                f'A{RADIUS},{RADIUS} 0 {large_arc} 0 {x2:.2f},{y2:.2f} Z" fill="{color}"/>'
+            )
+
+        # Подпись снаружи (1.1 радиуса) и процент внутри (0.6), как у matplotlib
+        middle = angle + span / 2
+        lx, ly = _point(middle, RADIUS * 1.1)
+        anchor = "start" if math.cos(math.radians(middle)) >= 0 else "end"
+        parts.append(
+            f'<text x="{lx:.2f}" y="{ly:.2f}" text-anchor="{anchor}" dominant-baseline="middle">'
+            f'{escape(str(name))}</text>'
+        )
+        px, py = _point(middle, RADIUS * 0.6)
+        parts.append(
+            f'<text x="{px:.2f}" y="{py:.2f}" text-anchor="middle" dominant-baseline="middle">'
+            f'{100 * value / total:.1f}%</text>'
+        )
+        angle += span
+
+    parts.append("</svg>")
+    return "\n".join(parts).encode("utf-8")
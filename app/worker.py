@@ -0,0 +1,131 @@
+"""
+Воркер фоновых выгрузок (POST /exports).
+
+    python -m app.worker
+
+Процессов можно запускать сколько угодно: задачи делятся через Redis.
+Внутри процесса одновременно выполняется до EXPORT_WORKER_CONCURRENCY задач.
+"""
+import asyncio
+import logging
+import signal
+from datetime import date
+
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.database import engine, new_session
+from app.dao.dao import CategoryDAO, TransactionDAO
+from app.models import User
+from app.schemas.export import ExportFormat
+from app.services.export_files import BUILDERS, MEDIA_TYPES, export_filename
+from app.services.exports import claim, complete, fail, promote_delayed, requeue_stale
+from app.services.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд ждать задачу в BLMOVE (и как часто проверять остановку)
+POLL_TIMEOUT = 5
+# Размер страницы при чтении транзакций (keyset, как в /transactions/report)
+EXPORT_PAGE_SIZE = 5000
+
+
+async def run_job(job: dict) -> tuple[bytes, str, str]:
+    fmt = ExportFormat(job["format"])
+    start_date = date.fromisoformat(job["start_date"])
+    end_date = date.fromisoformat(job["end_date"])
+    # DAO нужен только id пользователя
+    user = User(id=job["user_id"])
+
+    async with new_session() as session:
+        # Итоги (роллапы) и строки (transactions) — разные запросы: читаем их из одного снимка,
+        # иначе транзакция, записанная между ними, попадет только в одну часть файла.
+        # Границы периода у get_summary и get_report одинаковые: end_date включительно
+        await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        categories = {c.id: c.name for c in await CategoryDAO.find_all_by_user(session, user)}
+        summary = await TransactionDAO.get_summary(session, user, start_date, end_date)
+        rows = []
+        after = None
+        while True:
+            page = await TransactionDAO.get_report(session, user, start_date, end_date, EXPORT_PAGE_SIZE, after)
+            rows.extend(page)
+            if len(page) < EXPORT_PAGE_SIZE:
+                break
+            after = (page[-1]["transaction_date"], page[-1]["id"])
+
+    # Сборка файла — чистый CPU: уводим из event loop, чтобы не тормозить соседние задачи
+    content = await asyncio.to_thread(BUILDERS[fmt], rows, categories, summary, start_date, end_date)
+    return content, export_filename(fmt, start_date, end_date), MEDIA_TYPES[fmt]
+
+
+async def consume(stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            job = await claim(POLL_TIMEOUT)
+        except RedisError as e:
+            logger.warning("Redis недоступен: %s", e)
+            await asyncio.sleep(POLL_TIMEOUT)
+            continue
+        if job is None:
+            continue
+
+        logger.info("Выгрузка %s (%s), попытка %s", job["id"], job["format"], job["attempts"])
+        try:
+            content, filename, media_type = await asyncio.wait_for(run_job(job), settings.EXPORT_JOB_TIMEOUT)
+        except Exception as e:
+            logger.exception("Выгрузка %s не удалась", job["id"])
+            # Пользователю — без подробностей, они в логе
+            error = "Превышено время выгрузки" if isinstance(e, TimeoutError) else "Ошибка при построении файла"
+            try:
+                if await fail(job, error):
+                    logger.info("Выгрузка %s будет повторена", job["id"])
+            except RedisError as redis_error:
+                # Задача остается в exports:processing — ее вернет в очередь requeue_stale
+                logger.warning("Не удалось записать ошибку выгрузки %s, Redis недоступен: %s", job["id"], redis_error)
+        else:
+            try:
+                await complete(job, content, filename, media_type)
+            except RedisError as e:
+                # Не роняем воркер: задачу перезапустит requeue_stale
+                logger.warning("Не удалось сохранить выгрузку %s, Redis недоступен: %s", job["id"], e)
+                continue
+            logger.info("Выгрузка %s готова: %s байт", job["id"], len(content))
+
+async def housekeeping(stop: asyncio.Event):
+    """Переносит отложенные повторы в очередь и подбирает задачи упавших воркеров."""
+    last_stale_check = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        try:
+            await promote_delayed()
+            if loop.time() - last_stale_check >= settings.EXPORT_JOB_TIMEOUT:
+                last_stale_check = loop.time()
+                await requeue_stale()
+        except RedisError as e:
+            logger.warning("Redis недоступен: %s", e)
+        try:
+            await asyncio.wait_for(stop.wait(), POLL_TIMEOUT)
+        except TimeoutError:
+            pass
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Воркер выгрузок запущен, параллельно задач: %s", settings.EXPORT_WORKER_CONCURRENCY)
+    # По сигналу задачи дорабатывают текущую выгрузку и выходят
+    await asyncio.gather(
+        housekeeping(stop),
+        *(consume(stop) for _ in range(settings.EXPORT_WORKER_CONCURRENCY)),
+    )
+    await redis_client.aclose()
+    await engine.dispose()
+    logger.info("Воркер остановлен")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
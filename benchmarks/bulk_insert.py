@@ -0,0 +1,100 @@
+"""
+Скорость записи транзакций: TransactionDAO.create_many (как POST /transactions/bulk)
+против TransactionDAO.create на каждую строку (как POST /transactions/).
+
+    python -m benchmarks.bulk_insert --email bench-0@example.com --rows 20000 --batch 10000
+
+Пишет в категории пользователя из benchmarks.seed. Даты разбрасываются на --days дней,
+поэтому большая пачка дает тысячи разных ключей роллапа — проверяется и порезка
+upsert роллапов на пачки. После замера вставленное удаляется, роллапы откатываются.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from app.dao.dao import CategoryDAO, DailyRollupDAO, TransactionDAO, UserDAO
+from app.database import new_session
+from app.models import Transaction
+from app.schemas.transaction import STransactionCreate
+
+MARKER = "bench-bulk-insert"
+
+
+def make_items(category_ids: list[int], rows: int, days: int, rng: random.Random) -> list[STransactionCreate]:
+    now = datetime.now()
+    return [
+        STransactionCreate(
+            amount=round(rng.uniform(50, 5000), 2),
+            description=MARKER,
+            category_id=rng.choice(category_ids),
+            transaction_date=now - timedelta(seconds=rng.randint(0, days * 86400)),
+            type="income" if rng.random() < 0.1 else "expense",
+        )
+        for _ in range(rows)
+    ]
+
+
+async def insert_bulk(user, items: list[STransactionCreate], batch: int):
+    for start in range(0, len(items), batch):
+        async with new_session() as session:
+            await TransactionDAO.create_many(session, items[start:start + batch], user)
+
+
+async def insert_single(user, items: list[STransactionCreate], batch: int):
+    # Одна сессия на все вставки: меряем сами запросы и коммиты, а не открытие сессий
+    async with new_session() as session:
+        for item in items:
+            await TransactionDAO.create(session, item, user)
+
+
+async def cleanup(user):
+    """Удаляет вставленное и вычитает из роллапов ровно удаленные строки (даже после сбоя на середине)."""
+    async with new_session() as session:
+        result = await session.execute(
+            delete(Transaction)
+            .where(Transaction.user_id == user.id, Transaction.description == MARKER)
+            .returning(Transaction.amount_minor, Transaction.category_id, Transaction.transaction_date, Transaction.type)
+        )
+        await DailyRollupDAO.apply(session, user.id, result.all(), sign=-1)
+        await session.commit()
+
+
+async def main(args):
+    async with new_session() as session:
+        user = await UserDAO.find_by_email(session, args.email)
+        if user is None:
+            raise SystemExit(f"Нет пользователя {args.email}: сначала запустите benchmarks.seed")
+        category_ids = [category.id for category in await CategoryDAO.find_all_by_user(session, user)]
+    if not category_ids:
+        raise SystemExit(f"У {args.email} нет категорий")
+
+    rng = random.Random(args.seed)
+    # Поштучная вставка на порядок медленнее — даем ей меньше строк, сравниваем строки в секунду
+    variants = (
+        ("create_many", insert_bulk, args.rows),
+        ("create", insert_single, args.single_rows),
+    )
+    for name, func, rows in variants:
+        items = make_items(category_ids, rows, args.days, rng)
+        started = time.perf_counter()
+        try:
+            await func(user, items, args.batch)
+            elapsed = time.perf_counter() - started
+        finally:
+            await cleanup(user)
+        print(f"{name:<12} {rows:>7} строк за {elapsed:7.2f} с   {rows / elapsed:10.0f} строк/с")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bulk_insert")
+    parser.add_argument("--email", default="bench-0@example.com")
+    parser.add_argument("--rows", type=int, default=20_000, help="строк для create_many")
+    parser.add_argument("--single-rows", type=int, default=2_000, help="строк для поштучного create")
+    parser.add_argument("--batch", type=int, default=10_000, help="строк в одном create_many (как лимит /bulk)")
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,47 @@
+"""
+Сравнивает два результата benchmarks.load.
+
+    python -m benchmarks.compare old.json new.json --threshold 10
+
+Код возврата 1, если p95 или пропускная способность какого-то эндпоинта
+ухудшились больше чем на threshold процентов.
+"""
+import argparse
+import json
+import sys
+
+
+def change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10, help="допустимое ухудшение, %%")
+    args = parser.parse_args()
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)["results"]
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    regressed = False
+    print(f"{'эндпоинт':<12} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'rps':>18}")
+    for name in sorted(old.keys() & new.keys()):
+        a, b = old[name], new[name]
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            cells.append(f"{b[key]:>8} ({change(a[key], b[key]):+5.1f}%)")
+        print(f"{name:<12} " + " ".join(cells))
+        if change(a["p95_ms"], b["p95_ms"]) > args.threshold:
+            regressed = True
+        if -change(a["throughput_rps"], b["throughput_rps"]) > args.threshold:
+            regressed = True
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Время импорта app.main — то, что платит каждый API-процесс при старте.
+
+    python -m benchmarks.import_time --budget-ms 1200
+
+Каждый замер — новый интерпретатор с -X importtime (учитывается только импорт
+app.main, без старта самого Python). Берется медиана. Код возврата 1, если медиана
+больше бюджета или при импорте загрузился модуль из --forbid (по умолчанию matplotlib:
+он нужен только воркерам, которые рисуют PNG).
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+TARGET = "app.main"
+# После импорта печатаем загруженные модули, чтобы проверить --forbid
+PROBE = f"import sys, {TARGET}; print('\\n'.join(sys.modules))"
+# Общие с tests/test_import_time.py: регрессия ловится и в pytest, и здесь
+BUDGET_MS = 1200
+FORBID = ["matplotlib"]
+
+
+def measure_once(forbid: list[str]) -> tuple[float, list[tuple[int, str]], list[str]]:
+    """Время импорта TARGET в мс, самые тяжелые модули и загруженные запрещенные."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True, text=True, check=True
+    )
+    total_us = None
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        cumulative_us, name = int(cumulative), name.strip()
+        modules.append((cumulative_us, name))
+        if name == TARGET:
+            total_us = cumulative_us
+    if total_us is None:
+        raise RuntimeError(f"{TARGET} не найден в выводе -X importtime")
+    loaded = set(result.stdout.split())
+    found = [name for name in forbid if name in loaded]
+    return total_us / 1000, sorted(modules, reverse=True), found
+
+
+def main(args) -> int:
+    timings = []
+    heaviest = []
+    forbidden = []
+    for _ in range(args.repeat):
+        elapsed, heaviest, forbidden = measure_once(args.forbid)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"import {TARGET}: median {median:.0f} ms   min {min(timings):.0f} ms   budget {args.budget_ms:.0f} ms")
+    print("Самые тяжелые модули (cumulative, последний прогон):")
+    # Без вложенных: только пакеты верхнего уровня и модули приложения
+    shown = [(us, name) for us, name in heaviest if "." not in name or name.startswith("app.")]
+    for us, name in shown[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if forbidden:
+        print(f"❌ При импорте загружены: {', '.join(forbidden)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"❌ Импорт дольше бюджета на {median - args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("Импорт укладывается в бюджет ✅")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_time")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--forbid", nargs="*", default=FORBID)
+    sys.exit(main(parser.parse_args()))
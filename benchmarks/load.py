@@ -0,0 +1,261 @@
+"""
+Нагрузочный прогон API по основным эндпоинтам.
+
+    python -m benchmarks.load --users 1000 --concurrency 50 --duration 30
+
+По умолчанию поднимает uvicorn с приложением на свободном порту (--workers),
+с --base-url бьет в уже запущенный API. БД должна быть заполнена benchmarks.seed.
+Результат — p50/p95/p99 и пропускная способность по каждому эндпоинту — сохраняется
+в JSON (--output), чтобы сравнивать коммиты через benchmarks.compare.
+
+С --background login все время прогона параллельно идет шторм логинов (bcrypt),
+а меряются остальные сценарии — видно, насколько логины задевают соседние эндпоинты:
+
+    python -m benchmarks.load --scenarios report stats categories --output calm.json
+    python -m benchmarks.load --scenarios report stats categories --background login --output storm.json
+    python -m benchmarks.compare calm.json storm.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from app.config import settings
+from benchmarks.seed import BENCH_PASSWORD, bench_email
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def month_range() -> dict:
+    today = date.today()
+    start = today.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+
+def year_range() -> dict:
+    today = date.today()
+    return {"start_date": (today - timedelta(days=365)).isoformat(), "end_date": today.isoformat()}
+
+
+# Сценарий: (метод, путь, функция параметров, нужен ли токен)
+SCENARIOS = {
+    "report": ("GET", "/transactions/report", lambda: {**year_range(), "limit": 100}, True),
+    "stats": ("GET", "/transactions/stats", month_range, True),
+    "graph": ("GET", "/transactions/graph", month_range, True),
+    "categories": ("GET", "/categories/", dict, True),
+    "login": ("POST", "/auth/login", None, False),
+}
+
+
+# Сколько секунд повторять логин, пока API отвечает 503
+LOGIN_RETRY_SECONDS = 60
+
+
+async def login(client: httpx.AsyncClient, email: str) -> str:
+    """Логин с повтором на 503 через Retry-After: так API отвечает, когда заняты все слоты bcrypt."""
+    deadline = time.perf_counter() + LOGIN_RETRY_SECONDS
+    while True:
+        response = await client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+        if response.status_code != 503 or time.perf_counter() >= deadline:
+            break
+        await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def login_all(client: httpx.AsyncClient, emails: list[str], concurrency: int) -> list[str]:
+    """Токены для выборки пользователей, не больше concurrency логинов одновременно."""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(email: str) -> str:
+        async with slots:
+            return await login(client, email)
+
+    return await asyncio.gather(*(limited(email) for email in emails))
+
+
+async def run_scenario(client, name, emails, tokens, concurrency, duration=None, stop=None) -> dict:
+    """Гоняет сценарий duration секунд или, для фоновой нагрузки, до события stop."""
+    method, path, make_params, needs_token = SCENARIOS[name]
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    deadline = time.perf_counter() + duration if stop is None else None
+
+    def running() -> bool:
+        return time.perf_counter() < deadline if stop is None else not stop.is_set()
+
+    async def worker():
+        while running():
+            if needs_token:
+                request = dict(
+                    params=make_params(),
+                    headers={"Authorization": f"Bearer {random.choice(tokens)}"},
+                )
+            else:
+                request = dict(json={"email": random.choice(emails), "password": BENCH_PASSWORD})
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **request)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "statuses": statuses,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ])
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API не поднялся")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_server(args.workers)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    scenarios = [name for name in args.scenarios if name != args.background]
+    background = None
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await wait_ready(client)
+            emails = [bench_email(n) for n in range(args.users)]
+            # Токены для авторизованных сценариев — с выборки пользователей
+            sample = random.sample(emails, min(len(emails), args.token_users))
+            # Не больше потоков bcrypt одновременно: иначе API отвечает 503 еще до замеров
+            tokens = await login_all(client, sample, args.login_concurrency)
+
+            if args.background:
+                print(f"▶ фон: {args.background} × {args.background_concurrency}")
+                # Свой клиент и пул соединений: фон не занимает соединения измеряемых сценариев
+                background_client = httpx.AsyncClient(
+                    base_url=base_url,
+                    limits=httpx.Limits(max_connections=args.background_concurrency),
+                    timeout=60,
+                )
+                stop_background = asyncio.Event()
+                background_task = asyncio.create_task(run_scenario(
+                    background_client, args.background, emails, tokens,
+                    args.background_concurrency, stop=stop_background,
+                ))
+                # Даем шторму разогнаться до первых замеров
+                await asyncio.sleep(args.background_warmup)
+
+            results = {}
+            try:
+                for name in scenarios:
+                    print(f"▶ {name}...")
+                    results[name] = await run_scenario(
+                        client, name, emails, tokens, args.concurrency, args.duration
+                    )
+                    print(f"  {json.dumps(results[name], ensure_ascii=False)}")
+            finally:
+                if args.background:
+                    stop_background.set()
+                    background = await background_task
+                    await background_client.aclose()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if background is not None:
+        print(f"  фон {args.background}: {json.dumps(background, ensure_ascii=False)}")
+        p99 = ", ".join(f"{name} {result['p99_ms']} ms" for name, result in results.items())
+        print(f"p99 при фоновом {args.background}: {p99}")
+
+    report = {
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "workers": args.workers if args.base_url is None else None,
+            "background": args.background,
+            "background_concurrency": args.background_concurrency if args.background else None,
+        },
+        "results": results,
+        # Фон не сравнивается в benchmarks.compare: он — условие прогона, а не результат
+        "background": background,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результат сохранен в {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load")
+    parser.add_argument("--base-url", help="адрес уже запущенного API; без него поднимается uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="воркеров uvicorn")
+    parser.add_argument("--users", type=int, default=100, help="сколько bench-пользователей засеяно")
+    parser.add_argument("--token-users", type=int, default=200, help="скольких пользователей залогинить")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--login-concurrency", type=int, default=settings.BCRYPT_THREADS,
+        help="одновременных логинов при получении токенов (по умолчанию BCRYPT_THREADS)"
+    )
+    parser.add_argument("--duration", type=float, default=15, help="секунд на сценарий")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--background", choices=SCENARIOS, help="сценарий фоновой нагрузки на весь прогон, например login")
+    parser.add_argument("--background-concurrency", type=int, default=20)
+    parser.add_argument("--background-warmup", type=float, default=2, help="секунд фона до первого замера")
+    parser.add_argument("--output", default="bench_output.json")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+"""
+Сравнение пути /transactions/report: ORM + Pydantic против колонок + orjson.
+
+    python -m benchmarks.report_path --email bench-0@example.com --rows 50000
+
+Оба варианта читают одни и те же строки из заполненной benchmarks.seed базы
+и сериализуют их в JSON; меряется полное время (запрос + объекты + JSON).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import and_, select
+
+from app.dao.dao import TransactionDAO, UserDAO
+from app.database import new_session
+from app.models import Transaction
+from app.schemas.transaction import STransactionResponse
+
+START, END = date(1970, 1, 1), date(2100, 1, 1)
+orm_adapter = TypeAdapter(list[STransactionResponse])
+
+
+async def orm_path(session, user, rows: int) -> bytes:
+    """Прежний путь: ORM-объекты, валидация from_attributes, JSON через Pydantic."""
+    query = (
+        select(Transaction)
+        .where(and_(Transaction.user_id == user.id, Transaction.transaction_date >= START))
+        .order_by(Transaction.transaction_date, Transaction.id)
+        .limit(rows)
+    )
+    transactions = (await session.execute(query)).scalars().all()
+    return orm_adapter.dump_json(orm_adapter.validate_python(transactions, from_attributes=True))
+
+
+async def fast_path(session, user, rows: int) -> bytes:
+    transactions = await TransactionDAO.get_report(session, user, START, END, rows)
+    return orjson.dumps({"items": transactions, "next_cursor": None})
+
+
+async def measure(func, user, rows: int, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        # Новая сессия на каждый прогон, как у запроса: identity map не переиспользуется
+        async with new_session() as session:
+            start = time.perf_counter()
+            await func(session, user, rows)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main(args):
+    async with new_session() as session:
+        user = await UserDAO.find_by_email(session, args.email)
+    if user is None:
+        raise SystemExit(f"Нет пользователя {args.email}: сначала запустите benchmarks.seed")
+
+    for name, func in (("orm+pydantic", orm_path), ("columns+orjson", fast_path)):
+        await measure(func, user, args.rows, 1)  # прогрев
+        timings = await measure(func, user, args.rows, args.repeat)
+        print(f"{name:<16} median {statistics.median(timings):8.1f} ms   min {min(timings):8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.report_path")
+    parser.add_argument("--email", default="bench-0@example.com")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,104 @@
+"""
+Наполняет БД данными для нагрузочных тестов.
+
+    python -m benchmarks.seed --users 10000 --transactions 1000
+
+Пользователи получают email bench-<n>@example.com и пароль BENCH_PASSWORD.
+Категории и транзакции пишутся через DAO (CategoryDAO.create, TransactionDAO.create_many),
+поэтому роллапы и прочие побочные эффекты записи те же, что в проде.
+Пользователей вставляем напрямую с одним заранее посчитанным хешем:
+bcrypt на каждого из 10k пользователей занял бы больше получаса.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app.auth import get_password_hash
+from app.dao.dao import CategoryDAO, TransactionDAO
+from app.database import new_session
+from app.models import User
+from app.schemas.category import SCategoryCreate
+from app.schemas.transaction import STransactionCreate
+
+BENCH_PASSWORD = "bench-password"
+CATEGORY_NAMES = ["Еда", "Транспорт", "Жилье", "Развлечения", "Здоровье", "Одежда", "Связь", "Подарки"]
+
+
+def bench_email(n: int) -> str:
+    return f"bench-{n}@example.com"
+
+
+async def create_users(count: int) -> list[User]:
+    """Создает недостающих bench-пользователей и возвращает только новых (их и надо наполнить)."""
+    hashed = get_password_hash(BENCH_PASSWORD)
+    async with new_session() as session:
+        existing = set((await session.execute(
+            select(User.email).where(User.email.like("bench-%@example.com"))
+        )).scalars().all())
+        rows = [
+            {"email": bench_email(n), "hashed_password": hashed}
+            for n in range(count) if bench_email(n) not in existing
+        ]
+        if not rows:
+            return []
+        result = await session.execute(insert(User).returning(User, sort_by_parameter_order=True), rows)
+        users = list(result.scalars().all())
+        await session.commit()
+        return users
+
+
+async def seed_user(user: User, categories: int, transactions: int, days: int, rng: random.Random):
+    async with new_session() as session:
+        category_ids = [
+            (await CategoryDAO.create(session, SCategoryCreate(name=name), user)).id
+            for name in CATEGORY_NAMES[:categories]
+        ]
+        now = datetime.now()
+        items = [
+            STransactionCreate(
+                amount=round(rng.uniform(50, 5000), 2),
+                description=None,
+                category_id=rng.choice(category_ids),
+                transaction_date=now - timedelta(seconds=rng.randint(0, days * 86400)),
+                # Примерно каждая десятая операция — доход
+                type="income" if rng.random() < 0.1 else "expense",
+            )
+            for _ in range(transactions)
+        ]
+        await TransactionDAO.create_many(session, items, user)
+
+
+async def main(args):
+    started = time.perf_counter()
+    users = await create_users(args.users)
+    print(f"Новых пользователей: {len(users)}")
+
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    done = 0
+
+    async def worker(user: User):
+        nonlocal done
+        async with semaphore:
+            await seed_user(user, args.categories, args.transactions, args.days, random.Random(rng.random()))
+        done += 1
+        if done % 100 == 0:
+            print(f"  {done}/{len(users)} пользователей заполнено")
+
+    await asyncio.gather(*(worker(user) for user in users))
+    print(f"Готово за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.seed")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=1000, help="транзакций на пользователя")
+    parser.add_argument("--categories", type=int, default=5, help="категорий на пользователя")
+    parser.add_argument("--days", type=int, default=365, help="глубина истории в днях")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
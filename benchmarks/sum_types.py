@@ -0,0 +1,92 @@
+"""
+SUM по BIGINT (копейки) против SUM по NUMERIC(10, 2) на многомиллионной таблице.
+
+    python -m benchmarks.sum_types --rows 5000000
+
+Таблица bench_sum_types (UNLOGGED) заполняется через generate_series одними и теми же
+суммами в обоих типах и остается между запусками (--drop — удалить после прогона).
+Меряются итоговая сумма и сумма с GROUP BY по пользователю, как в статистике.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.database import new_session
+
+TABLE = "bench_sum_types"
+QUERIES = {
+    "total": "SELECT sum({column}) FROM " + TABLE,
+    "group by user": "SELECT user_id, sum({column}) FROM " + TABLE + " GROUP BY user_id",
+}
+COLUMNS = {"numeric": "amount", "bigint": "amount_minor"}
+
+
+async def prepare(session, rows: int, users: int):
+    await session.execute(text(
+        f"CREATE UNLOGGED TABLE IF NOT EXISTS {TABLE} "
+        "(user_id integer NOT NULL, amount numeric(10, 2) NOT NULL, amount_minor bigint NOT NULL)"
+    ))
+    existing = await session.scalar(text(f"SELECT count(*) FROM {TABLE}"))
+    if existing != rows:
+        print(f"Заполняем {TABLE}: {rows} строк...")
+        await session.execute(text(f"TRUNCATE {TABLE}"))
+        await session.execute(
+            text(
+                f"INSERT INTO {TABLE} (user_id, amount, amount_minor) "
+                "SELECT g % :users, m / 100.0, m "
+                "FROM (SELECT g, (5000 + floor(random() * 495000))::bigint AS m "
+                "FROM generate_series(1, :rows) AS g) AS s"
+            ),
+            {"users": users, "rows": rows}
+        )
+    await session.commit()
+    # VACUUM нельзя внутри транзакции, ANALYZE и прогрев кеша — можно
+    await session.execute(text(f"ANALYZE {TABLE}"))
+    await session.execute(text(f"SELECT count(*) FROM {TABLE}"))
+
+
+async def measure(session, sql: str, repeat: int) -> list[float]:
+    await session.execute(text(sql))  # прогрев
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await session.execute(text(sql))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main(args):
+    async with new_session() as session:
+        await prepare(session, args.rows, args.users)
+        if args.no_parallel:
+            # Стоимость агрегата на одном ядре, без parallel workers
+            await session.execute(text("SET max_parallel_workers_per_gather = 0"))
+
+        numeric_sum = await session.scalar(text(f"SELECT sum(amount) FROM {TABLE}"))
+        minor_sum = await session.scalar(text(f"SELECT sum(amount_minor) FROM {TABLE}"))
+        print(f"Суммы совпадают: {numeric_sum * 100 == minor_sum}")
+
+        for query_name, template in QUERIES.items():
+            for type_name, column in COLUMNS.items():
+                timings = await measure(session, template.format(column=column), args.repeat)
+                print(
+                    f"{query_name:<14} {type_name:<8} median {statistics.median(timings):8.1f} ms"
+                    f"   min {min(timings):8.1f} ms"
+                )
+
+        if args.drop:
+            await session.execute(text(f"DROP TABLE {TABLE}"))
+            await session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.sum_types")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--no-parallel", action="store_true")
+    parser.add_argument("--drop", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,26 @@
+import os
+
+import httpx
+
+
+def create_api_client() -> httpx.AsyncClient:
+    """
+    Один клиент API на весь бот: соединения держатся открытыми (keep-alive)
+    и переиспользуются всеми хендлерами.
+    Для API_HTTP2=1 нужен пакет h2 (pip install "httpx[http2]").
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("API_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("API_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("API_KEEPALIVE_EXPIRY", "30")),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("API_TIMEOUT", "10")),
+        connect=float(os.getenv("API_CONNECT_TIMEOUT", "5")),
+    )
+    return httpx.AsyncClient(
+        base_url=os.getenv("API_URL"),
+        limits=limits,
+        timeout=timeout,
+        http2=os.getenv("API_HTTP2", "0") == "1",
+    )
@@ -0,0 +1,157 @@
+"""
+Локальная замена Telegram Bot API для проверки режима webhook без настоящего Telegram.
+
+    python fake_telegram.py serve --port 8081
+    TELEGRAM_API_URL=http://localhost:8081 BOT_MODE=webhook WEBHOOK_BASE_URL=http://localhost:8080 python run.py
+    python fake_telegram.py send --text /start --user 1
+    python fake_telegram.py send --text "📊 Статистика" --users 50 --count 200
+
+serve принимает вызовы бота (/bot<token>/<method>), запоминает вебхук из setWebhook
+и пересылает на него апдейты, пришедшие в /_updates, — как это делает Telegram.
+Последние вызовы бота видны в GET /_calls.
+BOT_TOKEN может быть любым в формате 123456:ABC.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import deque
+
+import aiohttp
+from aiohttp import web
+
+counter = itertools.count(1)
+calls: deque = deque(maxlen=1000)
+webhook = {"url": None, "secret": None}
+
+
+def make_user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"Test {user_id}"}
+
+
+def make_message(chat_id: int, text: str | None = None, user_id: int | None = None) -> dict:
+    message = {
+        "message_id": next(counter),
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+    }
+    if user_id is not None:
+        message["from"] = make_user(user_id)
+    if text is not None:
+        message["text"] = text
+    return message
+
+
+async def bot_method(request: web.Request) -> web.Response:
+    method = request.match_info["method"]
+    # aiogram шлет form-data (multipart, если есть файлы)
+    fields = {key: (value if isinstance(value, str) else f"<файл {value.filename}>")
+              for key, value in (await request.post()).items()}
+    calls.append({"method": method, **fields})
+    print(f"← {method} {fields}")
+
+    if method == "setWebhook":
+        webhook["url"] = fields.get("url")
+        webhook["secret"] = fields.get("secret_token")
+        result = True
+    elif method == "deleteWebhook":
+        webhook["url"] = webhook["secret"] = None
+        result = True
+    elif method == "getWebhookInfo":
+        result = {"url": webhook["url"] or "", "has_custom_certificate": False, "pending_update_count": 0}
+    elif method == "getMe":
+        result = {"id": 1, "is_bot": True, "first_name": "Fake Bot", "username": "fake_bot"}
+    elif method.startswith(("send", "edit", "copy", "forward")):
+        result = make_message(int(fields.get("chat_id", 0)), fields.get("text") or fields.get("caption"))
+    else:
+        result = True
+    return web.json_response({"ok": True, "result": result})
+
+
+async def forward_updates(request: web.Request) -> web.Response:
+    """Пересылает апдейты на вебхук бота параллельно, как Telegram с несколькими соединениями."""
+    if not webhook["url"]:
+        return web.json_response({"error": "Бот еще не вызвал setWebhook"}, status=409)
+    updates = await request.json()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": webhook["secret"]} if webhook["secret"] else {}
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        async def post(update: dict) -> int:
+            async with session.post(webhook["url"], json=update, headers=headers) as response:
+                return response.status
+
+        statuses = await asyncio.gather(*(post(update) for update in updates))
+    return web.json_response({
+        "sent": len(updates),
+        "statuses": {str(s): statuses.count(s) for s in set(statuses)},
+        "seconds": round(time.perf_counter() - started, 3),
+    })
+
+
+async def recent_calls(request: web.Request) -> web.Response:
+    return web.json_response(list(calls))
+
+
+def serve(args):
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", bot_method)
+    app.router.add_post("/_updates", forward_updates)
+    app.router.add_get("/_calls", recent_calls)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+def build_update(user_id: int, text: str | None, callback_data: str | None) -> dict:
+    update_id = int(time.time() * 1000) % 10**9 + next(counter)
+    if callback_data is not None:
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": make_user(user_id),
+                "chat_instance": str(user_id),
+                "data": callback_data,
+                "message": make_message(user_id, "…"),
+            },
+        }
+    message = make_message(user_id, text, user_id)
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+async def send(args):
+    # Пользователи по кругу: user, user+1, ..., user+users-1
+    updates = [
+        build_update(args.user + i % args.users, args.text, args.callback)
+        for i in range(args.count)
+    ]
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{args.server.rstrip('/')}/_updates", json=updates) as response:
+            print(await response.json())
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python fake_telegram.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8081)
+
+    send_parser = commands.add_parser("send")
+    send_parser.add_argument("--server", default="http://127.0.0.1:8081")
+    send_parser.add_argument("--text", default="/start")
+    send_parser.add_argument("--callback", help="data нажатой inline-кнопки вместо сообщения")
+    send_parser.add_argument("--user", type=int, default=1)
+    send_parser.add_argument("--users", type=int, default=1)
+    send_parser.add_argument("--count", type=int, default=1)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        asyncio.run(send(args))
+
+
+if __name__ == "__main__":
+    main()
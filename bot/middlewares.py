@@ -0,0 +1,140 @@
+"""
+Защита API от серий нажатий: throttle (token bucket в Redis) и склейка одинаковых запросов.
+
+Хендлер включает защиту флагом: @dp.message(..., flags={"api_guard": "chart"}).
+Такой хендлер получает аргумент api_get — это api.get, в котором одинаковые
+GET-запросы одного пользователя, пока первый еще выполняется, ждут его ответ
+вместо повторного похода в API.
+"""
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Awaitable, Callable
+
+import httpx
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Лимиты по действиям: (запросов в секунду в среднем, размер пачки подряд)
+THROTTLE_LIMITS = {
+    "stats": (1 / float(os.getenv("THROTTLE_STATS_SECONDS", "5")), int(os.getenv("THROTTLE_STATS_BURST", "3"))),
+    "chart": (1 / float(os.getenv("THROTTLE_CHART_SECONDS", "15")), int(os.getenv("THROTTLE_CHART_BURST", "2"))),
+}
+
+# Атомарно: пополнить ведро по прошедшему времени и взять жетон.
+# Время берем у Redis, чтобы реплики бота с разными часами считали одинаково.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    def __init__(self, redis: aioredis.Redis):
+        self._script = redis.register_script(TOKEN_BUCKET_LUA)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """0 — жетон взят, иначе сколько секунд ждать следующего."""
+        return float(await self._script(keys=[key], args=[rate, burst]))
+
+
+class SingleFlight:
+    """Одновременные вызовы с одинаковым ключом выполняются один раз и делят результат."""
+
+    def __init__(self):
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    async def run(self, key: tuple, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            # shield: отмена одного ожидающего не отменяет запрос остальным
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже отдано ожидающим — не даем asyncio ругаться на непрочитанное
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+
+class ApiGuardMiddleware(BaseMiddleware):
+    """Для хендлеров с флагом api_guard: сначала throttle, потом api_get со склейкой запросов."""
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self.bucket = TokenBucket(redis)
+        self.single_flight = SingleFlight()
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: dict[str, Any],
+    ) -> Any:
+        action = get_flag(data, "api_guard")
+        if action is None:
+            return await handler(event, data)
+
+        user_id = event.from_user.id
+        rate, burst = THROTTLE_LIMITS[action]
+        try:
+            wait = await self.bucket.take(f"throttle:{user_id}:{action}", rate, burst)
+        except RedisError as e:
+            # Redis недоступен — не блокируем пользователя, просто без лимита
+            logger.warning("Throttle в Redis недоступен: %s", e)
+            wait = 0.0
+        if wait > 0:
+            await self._ask_to_wait(event, user_id, action, wait)
+            return None
+
+        api: httpx.AsyncClient = data["api"]
+
+        async def api_get(url: str, params: dict | None = None, **kwargs) -> httpx.Response:
+            key = (user_id, url, tuple(sorted((params or {}).items())))
+            return await self.single_flight.run(key, lambda: api.get(url, params=params, **kwargs))
+
+        data["api_get"] = api_get
+        return await handler(event, data)
+
+    async def _ask_to_wait(self, event: Message, user_id: int, action: str, wait: float):
+        """Отвечает «подождите» один раз за окно ожидания, а не на каждое нажатие."""
+        seconds = math.ceil(wait)
+        try:
+            first = await self.redis.set(f"throttle:{user_id}:{action}:notified", 1, ex=seconds, nx=True)
+        except RedisError:
+            first = True
+        if first:
+            await event.answer(f"⏳ Слишком часто! Попробуйте через {seconds} сек.")
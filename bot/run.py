@@ -1,4 +1,5 @@
 import asyncio
+import json
 import os
 import logging
 import httpx
@@ -7,6 +8,8 @@ import calendar
 
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, types, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
@@ -15,20 +18,50 @@ from aiogram.fsm.storage.redis import RedisStorage
 # Импорты
 from states import RegisterState, LoginState, CategoryState, TransactionState, CategoryEditState
 from keyboards import kb_start, kb_main
+from api_client import create_api_client
+from middlewares import ApiGuardMiddleware
+from webhook import run_webhook
 
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
-API_URL = os.getenv("API_URL")
-# Адрес Redis
-REDIS_URL = "redis://localhost:6379/0" 
+# Адрес Redis: общий для всех реплик бота (FSM, токены, кеш категорий)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# polling — один процесс тянет апдейты сам; webhook — aiohttp-сервер, можно несколько реплик
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# Снимать чужой вебхук при старте polling только явно: иначе локальный запуск с боевым
+# токеном молча отключит webhook-реплики
+BOT_DELETE_WEBHOOK = os.getenv("BOT_DELETE_WEBHOOK", "0") == "1"
+# Сколько апдейтов процесс обрабатывает одновременно (в обоих режимах)
+BOT_MAX_CONCURRENT_UPDATES = int(os.getenv("BOT_MAX_CONCURRENT_UPDATES", "50"))
+# Другой адрес Bot API, например локальный fake_telegram.py для тестов
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+# Страховочный TTL кеша категорий (сек): основное обновление — инвалидация при изменениях
+CATEGORIES_CACHE_TTL = int(os.getenv("CATEGORIES_CACHE_TTL", "600"))
 
 logging.basicConfig(level=logging.INFO)
 
 # --- НАСТРОЙКА REDIS ---
 storage = RedisStorage.from_url(REDIS_URL)
-bot = Bot(token=BOT_TOKEN)
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=BOT_TOKEN, session=session)
 dp = Dispatcher(storage=storage)
+# Throttle и склейка одинаковых запросов к API для хендлеров с флагом api_guard
+dp.message.middleware(ApiGuardMiddleware(storage.redis))
+
+# Общий клиент API с пулом соединений: создается при старте, закрывается при остановке
+api: httpx.AsyncClient | None = None
+
+@dp.startup()
+async def on_startup():
+    global api
+    api = create_api_client()
+    # Через workflow_data клиент доступен middleware
+    dp["api"] = api
+
+@dp.shutdown()
+async def on_shutdown():
+    await api.aclose()
 
 # --- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ---
 async def save_token(user_id: int, token: str):
@@ -42,6 +75,27 @@ async def get_token(user_id: int) -> str | None:
         return token.decode("utf-8")
     return None
 
+async def fetch_categories(user_id: int, token: str) -> list | None:
+    """Категории пользователя из кеша в Redis, при промахе — из API. None — ошибка API."""
+    cache_key = f"user:{user_id}:categories"
+    cached = await storage.redis.get(cache_key)
+    if cached:
+        return json.loads(cached)
+
+    response = await api.get(
+        "/categories/",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    if response.status_code != 200:
+        return None
+    categories = response.json()
+    await storage.redis.set(cache_key, json.dumps(categories), ex=CATEGORIES_CACHE_TTL)
+    return categories
+
+async def invalidate_categories(user_id: int):
+    """Сбрасывает кеш категорий после любого их изменения."""
+    await storage.redis.delete(f"user:{user_id}:categories")
+
 # --- СТАРТ ---
 @dp.message(CommandStart())
 async def cmd_start(message: types.Message):
@@ -69,15 +123,14 @@ async def reg_email(message: types.Message, state: FSMContext):
 async def reg_password(message: types.Message, state: FSMContext):
     await state.update_data(password=message.text)
     data = await state.get_data()
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(f"{API_URL}/auth/register", json=data)
-            if response.status_code == 200:
-                await message.answer("✅ Успешно! Жмите '🔑 Вход'.", reply_markup=kb_start)
-            else:
-                await message.answer(f"❌ Ошибка: {response.text}", reply_markup=kb_start)
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+    try:
+        response = await api.post("/auth/register", json=data)
+        if response.status_code == 200:
+            await message.answer("✅ Успешно! Жмите '🔑 Вход'.", reply_markup=kb_start)
+        else:
+            await message.answer(f"❌ Ошибка: {response.text}", reply_markup=kb_start)
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
     await state.clear()
 
 @dp.message(F.text == "🔑 Вход")
@@ -95,24 +148,26 @@ async def login_email(message: types.Message, state: FSMContext):
 async def login_password(message: types.Message, state: FSMContext):
     await state.update_data(password=message.text)
     data = await state.get_data()
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(f"{API_URL}/auth/login", json=data)
-            if response.status_code == 200:
-                token = response.json()['access_token']
-                # Сохраняем в Redis
-                await save_token(message.from_user.id, token)
-                await message.answer("✅ Вы вошли!", reply_markup=kb_main)
-            else:
-                await message.answer("❌ Неверные данные.", reply_markup=kb_start)
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+    try:
+        response = await api.post("/auth/login", json=data)
+        if response.status_code == 200:
+            token = response.json()['access_token']
+            # Сохраняем в Redis
+            await save_token(message.from_user.id, token)
+            # Могли войти в другой аккаунт — категории прошлого не подходят
+            await invalidate_categories(message.from_user.id)
+            await message.answer("✅ Вы вошли!", reply_markup=kb_main)
+        else:
+            await message.answer("❌ Неверные данные.", reply_markup=kb_start)
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
     await state.clear()
 
 @dp.message(F.text == "🚪 Выход")
 async def process_logout(message: types.Message, state: FSMContext):
     redis_key = f"user:{message.from_user.id}:token"
     await storage.redis.delete(redis_key)
+    await invalidate_categories(message.from_user.id)
     await state.clear()
     await message.answer("Вы успешно вышли. 👋", reply_markup=kb_start)
 
@@ -122,39 +177,34 @@ async def process_logout(message: types.Message, state: FSMContext):
 
 # Вспомогательная функция для отображения списка
 async def show_categories_list(message_or_call, user_id, token):
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{API_URL}/categories/",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code == 200:
-                categories = response.json()
-                if not categories:
-                    text = "Список категорий пуст."
-                    keyboard = None
-                else:
-                    text = "📂 Ваши категории:\nВыберите категорию для управления:"
-                    buttons = [
-                        [InlineKeyboardButton(text=f"🔹 {cat['name']}", callback_data=f"open_cat_{cat['id']}")]
-                        for cat in categories
-                    ]
-                    keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
+    try:
+        categories = await fetch_categories(user_id, token)
+        if categories is not None:
+            if not categories:
+                text = "Список категорий пуст."
+                keyboard = None
+            else:
+                text = "📂 Ваши категории:\nВыберите категорию для управления:"
+                buttons = [
+                    [InlineKeyboardButton(text=f"🔹 {cat['name']}", callback_data=f"open_cat_{cat['id']}")]
+                    for cat in categories
+                ]
+                keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
                 
-                if isinstance(message_or_call, types.Message):
-                    await message_or_call.answer(text, reply_markup=keyboard)
-                else:
-                    await message_or_call.message.edit_text(text, reply_markup=keyboard)
+            if isinstance(message_or_call, types.Message):
+                await message_or_call.answer(text, reply_markup=keyboard)
             else:
-                err_text = "❌ Ошибка API."
-                if isinstance(message_or_call, types.Message):
-                    await message_or_call.answer(err_text)
-                else:
-                    await message_or_call.message.edit_text(err_text)
-        except Exception as e:
-            err_text = f"Ошибка: {e}"
+                await message_or_call.message.edit_text(text, reply_markup=keyboard)
+        else:
+            err_text = "❌ Ошибка API."
             if isinstance(message_or_call, types.Message):
                 await message_or_call.answer(err_text)
+            else:
+                await message_or_call.message.edit_text(err_text)
+    except Exception as e:
+        err_text = f"Ошибка: {e}"
+        if isinstance(message_or_call, types.Message):
+            await message_or_call.answer(err_text)
 
 # 1. Обработчик кнопки меню "Мои категории"
 @dp.message(F.text == "📂 Мои категории")
@@ -229,19 +279,19 @@ async def process_confirm_edit(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     token = await get_token(callback.from_user.id)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.put(
-                f"{API_URL}/categories/{data['editing_cat_id']}",
-                json={"name": data['new_name']},
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code == 200:
-                await callback.message.edit_text("✅ Успешно изменено!")
-            else:
-                await callback.message.edit_text(f"❌ Ошибка API: {response.text}")
-        except Exception as e:
-            await callback.message.edit_text(f"Ошибка: {e}")
+    try:
+        response = await api.put(
+            f"/categories/{data['editing_cat_id']}",
+            json={"name": data['new_name']},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 200:
+            await invalidate_categories(callback.from_user.id)
+            await callback.message.edit_text("✅ Успешно изменено!")
+        else:
+            await callback.message.edit_text(f"❌ Ошибка API: {response.text}")
+    except Exception as e:
+        await callback.message.edit_text(f"Ошибка: {e}")
 
     await state.clear()
     await asyncio.sleep(1)
@@ -258,23 +308,23 @@ async def start_add_cat(message: types.Message, state: FSMContext):
 @dp.message(CategoryState.waiting_for_name)
 async def process_add_cat(message: types.Message, state: FSMContext):
     token = await get_token(message.from_user.id)
-    async with httpx.AsyncClient() as client:
-        res = await client.post(
-            f"{API_URL}/categories/", 
-            json={"name": message.text},
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        if res.status_code == 200:
-            await message.answer(f"✅ Категория '{message.text}' создана!")
-        else:
-            await message.answer("Ошибка создания.")
+    res = await api.post(
+        "/categories/", 
+        json={"name": message.text},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    if res.status_code == 200:
+        await invalidate_categories(message.from_user.id)
+        await message.answer(f"✅ Категория '{message.text}' создана!")
+    else:
+        await message.answer("Ошибка создания.")
     await state.clear()
 
 # ==========================================
 # TRANSACTIONS
 # ==========================================
-@dp.message(F.text == "📊 Статистика")
-async def get_stats(message: types.Message):
+@dp.message(F.text == "📊 Статистика", flags={"api_guard": "stats"})
+async def get_stats(message: types.Message, api_get):
     token = await get_token(message.from_user.id)
     if not token:
         await message.answer("⚠️ Войдите в систему!")
@@ -287,30 +337,29 @@ async def get_stats(message: types.Message):
 
     await message.answer(f"📊 Считаю финансы за {now.strftime('%B %Y')}...")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{API_URL}/transactions/stats",
-                params={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
-                headers={"Authorization": f"Bearer {token}"}
+    try:
+        response = await api_get(
+            "/transactions/stats",
+            params={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 200:
+            stats = response.json()
+            text = (
+                f"📅 Статистика за текущий месяц:\n\n"
+                f"📈 Доходы: {stats['total_income']:,.2f} ₽\n"
+                f"📉 Расходы: {stats['total_expense']:,.2f} ₽\n"
+                f"➖➖➖➖➖➖➖➖➖➖\n"
+                f"💰 Баланс: {stats['balance']:,.2f} ₽"
             )
-            if response.status_code == 200:
-                stats = response.json()
-                text = (
-                    f"📅 Статистика за текущий месяц:\n\n"
-                    f"📈 Доходы: {stats['total_income']:,.2f} ₽\n"
-                    f"📉 Расходы: {stats['total_expense']:,.2f} ₽\n"
-                    f"➖➖➖➖➖➖➖➖➖➖\n"
-                    f"💰 Баланс: {stats['balance']:,.2f} ₽"
-                )
-                await message.answer(text)
-            else:
-                await message.answer(f"❌ Ошибка API: {response.text}")
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+            await message.answer(text)
+        else:
+            await message.answer(f"❌ Ошибка API: {response.text}")
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
 
-@dp.message(F.text == "🎨 Диаграмма")
-async def get_chart(message: types.Message):
+@dp.message(F.text == "🎨 Диаграмма", flags={"api_guard": "chart"})
+async def get_chart(message: types.Message, api_get):
     token = await get_token(message.from_user.id)
     if not token:
         await message.answer("⚠️ Войдите в систему!")
@@ -323,23 +372,22 @@ async def get_chart(message: types.Message):
 
     await message.answer("Рисую диаграмму... 🎨")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{API_URL}/transactions/graph",
-                params={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code == 200:
-                from aiogram.types import BufferedInputFile
-                photo = BufferedInputFile(response.content, filename="chart.png")
-                await message.answer_photo(photo, caption=f"Ваши расходы за {now.strftime('%B %Y')}")
-            elif response.status_code == 404:
-                await message.answer("Нет данных для диаграммы.")
-            else:
-                await message.answer(f"❌ Ошибка API: {response.text}")
-        except Exception as e:
-            await message.answer(f"Ошибка: {e}")
+    try:
+        response = await api_get(
+            "/transactions/graph",
+            params={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 200:
+            from aiogram.types import BufferedInputFile
+            photo = BufferedInputFile(response.content, filename="chart.png")
+            await message.answer_photo(photo, caption=f"Ваши расходы за {now.strftime('%B %Y')}")
+        elif response.status_code == 404:
+            await message.answer("Нет данных для диаграммы.")
+        else:
+            await message.answer(f"❌ Ошибка API: {response.text}")
+    except Exception as e:
+        await message.answer(f"Ошибка: {e}")
 
 # --- ТРАНЗАКЦИИ ВВОД ---
 @dp.message(F.text.in_({"💸 Добавить доход", "💸 Добавить расход"}))
@@ -364,28 +412,23 @@ async def process_amount(message: types.Message, state: FSMContext):
     await state.update_data(amount=amount)
     
     token = await get_token(message.from_user.id)
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{API_URL}/categories/",
-            headers={"Authorization": f"Bearer {token}"}
-        )
-        if response.status_code == 200:
-            categories = response.json()
-            if not categories:
-                await message.answer("❌ Нет категорий. Сначала создайте их!")
-                await state.clear()
-                return
-            
-            buttons = [
-                [InlineKeyboardButton(text=cat['name'], callback_data=f"cat_{cat['id']}")]
-                for cat in categories
-            ]
-            keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
-            await message.answer("Выберите категорию:", reply_markup=keyboard)
-            await state.set_state(TransactionState.waiting_for_category)
-        else:
-            await message.answer("Ошибка API при загрузке категорий.")
+    categories = await fetch_categories(message.from_user.id, token)
+    if categories is not None:
+        if not categories:
+            await message.answer("❌ Нет категорий. Сначала создайте их!")
             await state.clear()
+            return
+            
+        buttons = [
+            [InlineKeyboardButton(text=cat['name'], callback_data=f"cat_{cat['id']}")]
+            for cat in categories
+        ]
+        keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
+        await message.answer("Выберите категорию:", reply_markup=keyboard)
+        await state.set_state(TransactionState.waiting_for_category)
+    else:
+        await message.answer("Ошибка API при загрузке категорий.")
+        await state.clear()
 
 @dp.callback_query(TransactionState.waiting_for_category)
 async def process_category_click(callback: CallbackQuery, state: FSMContext):
@@ -403,33 +446,49 @@ async def process_description(message: types.Message, state: FSMContext):
     data['description'] = description
     
     token = await get_token(message.from_user.id)
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{API_URL}/transactions/",
-                json=data,
-                headers={"Authorization": f"Bearer {token}"}
+    try:
+        response = await api.post(
+            "/transactions/",
+            json=data,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 200:
+            tran = response.json()
+            await message.answer(
+                f"✅ Записано!\n"
+                f"Сумма: {tran['amount']} ₽\n"
+                f"Тип: {'Доход' if tran['type'] == 'income' else 'Расход'}",
+                reply_markup=kb_main
             )
-            if response.status_code == 200:
-                tran = response.json()
-                await message.answer(
-                    f"✅ Записано!\n"
-                    f"Сумма: {tran['amount']} ₽\n"
-                    f"Тип: {'Доход' if tran['type'] == 'income' else 'Расход'}",
-                    reply_markup=kb_main
-                )
-            else:
-                await message.answer(f"❌ Ошибка API: {response.text}")
-        except Exception as e:
-            await message.answer(f"Ошибка соединения: {e}")
+        else:
+            await message.answer(f"❌ Ошибка API: {response.text}")
+    except Exception as e:
+        await message.answer(f"Ошибка соединения: {e}")
     await state.clear()
 
 async def main():
+    # getUpdates не работает, пока установлен вебхук (например, после режима webhook)
+    webhook_info = await bot.get_webhook_info()
+    if webhook_info.url:
+        if not BOT_DELETE_WEBHOOK:
+            logging.warning(
+                "У бота установлен вебхук %s: polling его снимет, и webhook-реплики перестанут "
+                "получать апдейты. Если так и нужно, запустите с BOT_DELETE_WEBHOOK=1",
+                webhook_info.url
+            )
+            await bot.session.close()
+            raise SystemExit(1)
+        logging.warning("Снимаем вебхук %s для polling", webhook_info.url)
+        await bot.delete_webhook()
     print("Бот запущен с Redis! 🐘")
-    await dp.start_polling(bot)
+    await dp.start_polling(bot, tasks_concurrency_limit=BOT_MAX_CONCURRENT_UPDATES)
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        print("Бот выключен")
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        print("Бот запущен в режиме webhook 🌐")
+        run_webhook(dp, bot, BOT_MAX_CONCURRENT_UPDATES)
+    else:
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            print("Бот выключен")
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+Режим вебхука: Telegram шлет апдейты POST-запросами на aiohttp-сервер.
+
+Реплик можно поднять сколько угодно за балансировщиком: состояние FSM и токены
+лежат в общем Redis, а сам процесс ничего между апдейтами не хранит.
+Внутри процесса одновременно обрабатывается до BOT_MAX_CONCURRENT_UPDATES апдейтов;
+когда все слоты заняты, ответ Telegram задерживается и он сам сбавляет темп.
+"""
+import asyncio
+import logging
+import os
+import secrets
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+# Публичный адрес балансировщика, например https://bot.example.com
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# setWebhook достаточно одной реплике: остальным ставим WEBHOOK_SET_ON_STARTUP=0
+WEBHOOK_SET_ON_STARTUP = os.getenv("WEBHOOK_SET_ON_STARTUP", "1") == "1"
+# Сколько параллельных соединений Telegram откроет к вебхуку (на все реплики)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+# Сколько секунд ждать недоработанные апдейты при остановке
+SHUTDOWN_GRACE = float(os.getenv("WEBHOOK_SHUTDOWN_GRACE", "10"))
+
+
+class UpdateHandler:
+    """
+    Принимает апдейт, отвечает Telegram сразу и обрабатывает его в фоне,
+    но не больше max_concurrent апдейтов одновременно.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, max_concurrent: int, secret: str | None = None):
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and not secrets.compare_digest(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), self.secret
+        ):
+            return web.Response(status=401, text="Unauthorized")
+        update = await request.json()
+
+        # Ждем свободный слот, не отвечая: так медленный /graph не копит бесконечную очередь задач
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return web.json_response({})
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._slots.release()
+
+    async def _process(self, update: dict):
+        try:
+            result = await self.dp.feed_raw_update(self.bot, update)
+            # Хендлер может вернуть метод API вместо вызова — выполняем его сами
+            if isinstance(result, TelegramMethod):
+                await self.dp.silent_call_request(self.bot, result)
+        except Exception:
+            logger.exception("Ошибка обработки апдейта %s", update.get("update_id"))
+
+    async def drain(self, app: web.Application):
+        """Дорабатывает начатые апдейты перед остановкой (до SHUTDOWN_GRACE секунд)."""
+        if self._tasks:
+            logger.info("Дорабатываем апдейты: %s", len(self._tasks))
+            await asyncio.wait(self._tasks, timeout=SHUTDOWN_GRACE)
+
+
+async def healthz(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def run_webhook(dp: Dispatcher, bot: Bot, max_concurrent: int):
+    handler = UpdateHandler(dp, bot, max_concurrent, secret=WEBHOOK_SECRET)
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handler.handle)
+    app.router.add_get("/healthz", healthz)
+    # drain регистрируем раньше setup_application: апдейты доделываются до dp.shutdown (закрытия клиента API)
+    app.on_shutdown.append(handler.drain)
+    setup_application(app, dp, bot=bot)
+
+    if WEBHOOK_SET_ON_STARTUP:
+        if not WEBHOOK_BASE_URL:
+            raise RuntimeError("Для режима webhook нужен WEBHOOK_BASE_URL")
+
+        async def set_webhook(app: web.Application):
+            await bot.set_webhook(
+                WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+            )
+            logger.info("Вебхук установлен: %s%s", WEBHOOK_BASE_URL, WEBHOOK_PATH)
+
+        app.on_startup.append(set_webhook)
+
+    # Сессию бота закрываем последней. deleteWebhook при остановке не вызываем:
+    # остальные реплики продолжают принимать апдейты
+    async def close_bot(app: web.Application):
+        await bot.session.close()
+
+    app.on_cleanup.append(close_bot)
+    web.run_app(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
@@ -0,0 +1,75 @@
+"""Add transaction report indexes
+
+Revision ID: 4b7e21c9d0a3
+Revises: dc9c0c9e18dd
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e21c9d0a3'
+down_revision: Union[str, Sequence[str], None] = 'dc9c0c9e18dd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _close_implicit_transaction() -> None:
+    """
+    pg8000 сам открывает транзакцию на запросе уровня изоляции, который alembic делает
+    перед переходом в AUTOCOMMIT, и она остается открытой. Закрываем ее, иначе
+    CONCURRENTLY упадет с "cannot run inside a transaction block".
+    Если транзакции нет, Postgres ответит только предупреждением.
+    """
+    op.execute("COMMIT")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в таблицы на время построения,
+    # но не работает внутри транзакции — поэтому autocommit_block
+    with op.get_context().autocommit_block():
+        _close_implicit_transaction()
+        op.create_index(
+            op.f('ix_categories_user_id'),
+            'categories',
+            ['user_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_transactions_user_id_transaction_date',
+            'transactions',
+            ['user_id', 'transaction_date'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_transactions_user_id_type_transaction_date',
+            'transactions',
+            ['user_id', 'type', 'transaction_date'],
+            unique=False,
+            postgresql_include=['amount', 'category_id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        _close_implicit_transaction()
+        op.drop_index(
+            'ix_transactions_user_id_type_transaction_date',
+            table_name='transactions',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_transactions_user_id_transaction_date',
+            table_name='transactions',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(op.f('ix_categories_user_id'), table_name='categories', postgresql_concurrently=True)
@@ -0,0 +1,63 @@
+"""Store amounts in minor units
+
+Revision ID: 5a2c9e7b1f40
+Revises: c41d8b2f6e97
+Create Date: 2026-10-18 21:02:11.637520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a2c9e7b1f40'
+down_revision: Union[str, Sequence[str], None] = 'c41d8b2f6e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Суммы в копейках (BIGINT) вместо NUMERIC: NUMERIC(10, 2) умножается на 100 без потерь
+    op.add_column('transactions', sa.Column('amount_minor', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE transactions SET amount_minor = (amount * 100)::bigint")
+    op.alter_column('transactions', 'amount_minor', nullable=False)
+    # Покрывающий индекс должен включать новую колонку, иначе index-only scan пропадет
+    op.drop_index('ix_transactions_user_id_type_transaction_date', table_name='transactions')
+    op.drop_column('transactions', 'amount')
+    op.create_index(
+        'ix_transactions_user_id_type_transaction_date',
+        'transactions',
+        ['user_id', 'type', 'transaction_date'],
+        unique=False,
+        postgresql_include=['amount_minor', 'category_id'],
+    )
+
+    op.add_column('daily_rollups', sa.Column('total_minor', sa.BigInteger(), server_default='0', nullable=False))
+    op.execute("UPDATE daily_rollups SET total_minor = (total_amount * 100)::bigint")
+    op.drop_column('daily_rollups', 'total_amount')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column(
+        'daily_rollups',
+        sa.Column('total_amount', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    )
+    op.execute("UPDATE daily_rollups SET total_amount = total_minor / 100.0")
+    op.drop_column('daily_rollups', 'total_minor')
+
+    op.add_column('transactions', sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.execute("UPDATE transactions SET amount = amount_minor / 100.0")
+    op.alter_column('transactions', 'amount', nullable=False)
+    op.drop_index('ix_transactions_user_id_type_transaction_date', table_name='transactions')
+    op.drop_column('transactions', 'amount_minor')
+    op.create_index(
+        'ix_transactions_user_id_type_transaction_date',
+        'transactions',
+        ['user_id', 'type', 'transaction_date'],
+        unique=False,
+        postgresql_include=['amount', 'category_id'],
+    )
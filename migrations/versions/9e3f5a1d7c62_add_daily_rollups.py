@@ -0,0 +1,47 @@
+"""Add daily rollups
+
+Revision ID: 9e3f5a1d7c62
+Revises: 4b7e21c9d0a3
+Create Date: 2026-10-18 11:04:15.532907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3f5a1d7c62'
+down_revision: Union[str, Sequence[str], None] = '4b7e21c9d0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_rollups',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'category_id', 'type')
+    )
+    # Заполняем роллапы по уже существующим транзакциям
+    op.execute(
+        """
+        INSERT INTO daily_rollups (user_id, category_id, day, type, total_amount, count)
+        SELECT user_id, category_id, transaction_date::date, type, SUM(amount), COUNT(*)
+        FROM transactions
+        GROUP BY user_id, category_id, transaction_date::date, type
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_rollups')
@@ -0,0 +1,134 @@
+"""Partition transactions by month
+
+Revision ID: c41d8b2f6e97
+Revises: 9e3f5a1d7c62
+Create Date: 2026-10-18 20:15:42.904318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d8b2f6e97'
+down_revision: Union[str, Sequence[str], None] = '9e3f5a1d7c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, amount, description, transaction_date, created_at, type, user_id, category_id"
+
+
+def _rename_old_table() -> None:
+    # Имена индексов уникальны в схеме — старые освобождаем для новой таблицы
+    op.execute("ALTER TABLE transactions RENAME TO transactions_old")
+    op.execute("ALTER TABLE transactions_old RENAME CONSTRAINT transactions_pkey TO transactions_old_pkey")
+    op.execute("ALTER INDEX ix_transactions_user_id_transaction_date RENAME TO ix_transactions_old_user_id_transaction_date")
+    op.execute(
+        "ALTER INDEX ix_transactions_user_id_type_transaction_date "
+        "RENAME TO ix_transactions_old_user_id_type_transaction_date"
+    )
+
+
+def _create_indexes() -> None:
+    op.create_index(
+        'ix_transactions_user_id_transaction_date',
+        'transactions',
+        ['user_id', 'transaction_date'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_transactions_user_id_type_transaction_date',
+        'transactions',
+        ['user_id', 'type', 'transaction_date'],
+        unique=False,
+        postgresql_include=['amount', 'category_id'],
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rename_old_table()
+
+    # Ключ партиционирования обязан входить в первичный ключ.
+    # id продолжает брать значения из той же sequence, поэтому остается уникальным.
+    op.execute(
+        """
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            amount NUMERIC(10, 2) NOT NULL,
+            description VARCHAR,
+            transaction_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            type VARCHAR NOT NULL DEFAULT 'expense',
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            category_id INTEGER NOT NULL REFERENCES categories (id),
+            PRIMARY KEY (id, transaction_date)
+        ) PARTITION BY RANGE (transaction_date)
+        """
+    )
+    # Иначе sequence удалится вместе со старой таблицей
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    _create_indexes()
+
+    # Помесячные партиции от первой транзакции (но не глубже 10 лет) до +3 месяцев вперед.
+    # Даты вне этого диапазона попадают в DEFAULT-партицию, а не в ошибку вставки.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            first_month date;
+            part_month date;
+        BEGIN
+            SELECT GREATEST(
+                date_trunc('month', COALESCE(MIN(transaction_date), now())),
+                date_trunc('month', now()) - interval '10 years'
+            )::date INTO first_month
+            FROM transactions_old;
+
+            FOR part_month IN
+                SELECT generate_series(first_month, date_trunc('month', now())::date + interval '3 months', interval '1 month')::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                    'transactions_p' || to_char(part_month, 'YYYY_MM'),
+                    part_month,
+                    (part_month + interval '1 month')::date
+                );
+            END LOOP;
+        END
+        $$
+        """
+    )
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_old")
+    op.execute("DROP TABLE transactions_old")
+    op.execute("ANALYZE transactions")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rename_old_table()
+
+    op.create_table('transactions',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('transactions_id_seq')"), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('transaction_date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('type', sa.String(), server_default='expense', nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    _create_indexes()
+
+    # Отцепленные командой partitions-detach партиции сюда не вернутся — их данные остаются в своих таблицах
+    op.execute(f"INSERT INTO transactions ({COLUMNS}) SELECT {COLUMNS} FROM transactions_old")
+    # Партиции удаляются вместе с родительской таблицей
+    op.execute("DROP TABLE transactions_old")
@@ -0,0 +1,15 @@
+import os
+from pathlib import Path
+
+# Settings() требует DB_*: без них импорт app падает еще на сборке тестов.
+# Тестам настоящая база из DB_* не нужна (план-тесты ходят по TEST_DATABASE_URL),
+# поэтому подставляем заглушки — но не поверх окружения и не поверх .env.
+if not Path(".env").exists():
+    for name, value in {
+        "DB_HOST": "127.0.0.1",
+        "DB_PORT": "5432",
+        "DB_USER": "postgres",
+        "DB_PASSWORD": "postgres",
+        "DB_NAME": "finance_app",
+    }.items():
+        os.environ.setdefault(name, value)
@@ -0,0 +1,38 @@
+"""
+Бюджет времени импорта app.main (см. benchmarks/import_time.py).
+
+Замер — отдельные интерпретаторы с -X importtime, поэтому тест идет несколько секунд.
+"""
+import os
+import statistics
+from pathlib import Path
+
+import pytest
+
+from benchmarks.import_time import BUDGET_MS, FORBID, measure_once
+
+REPEAT = 5
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="module")
+def measurements(monkeypatch_module):
+    # Дочерний интерпретатор должен найти app, даже если pytest запущен не из корня
+    monkeypatch_module.setenv("PYTHONPATH", str(ROOT), prepend=os.pathsep)
+    return [measure_once(FORBID) for _ in range(REPEAT)]
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        yield monkeypatch
+
+
+def test_import_within_budget(measurements):
+    median = statistics.median(elapsed for elapsed, _, _ in measurements)
+    assert median <= BUDGET_MS, f"import app.main: медиана {median:.0f} ms при бюджете {BUDGET_MS} ms"
+
+
+def test_forbidden_modules_not_loaded(measurements):
+    forbidden = sorted({name for _, _, found in measurements for name in found})
+    assert not forbidden, f"При импорте app.main загружены: {', '.join(forbidden)}"